@@ -1,26 +1,130 @@
 import streamlit as st
 import pandas as pd
 import re
+import functools
+import logging
+import os
+import tempfile
  
 from datetime import datetime
+from itertools import chain, islice
 from pathlib import Path
 from docx import Document
 from docx.shared import Inches, Pt, RGBColor
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.enum.table import WD_TABLE_ALIGNMENT
-from docx.oxml.ns import qn
-from docx.oxml import OxmlElement
+from docx.oxml.ns import qn, nsdecls
+from docx.oxml import parse_xml
+from docx.text.paragraph import Paragraph
 import html
 import io
+from copy import deepcopy
 from PIL import Image, ImageDraw, ImageFont
 
-@st.cache_data
+logger = logging.getLogger(__name__)
+
+def _ensure_parquet(csv_path):
+    """Return a Parquet copy of ``csv_path``, rebuilding it whenever the CSV is newer.
+
+    Returns ``None`` when pyarrow is unavailable or the copy cannot be written,
+    so callers can fall back to reading the CSV directly.
+    """
+    csv_file = Path(csv_path)
+    parquet_file = csv_file.with_name(f"{csv_file.name}.parquet")
+    tmp_path = None
+    try:
+        if not parquet_file.exists() or parquet_file.stat().st_mtime < csv_file.stat().st_mtime:
+            # เขียนลงไฟล์ชั่วคราวในโฟลเดอร์เดียวกันก่อน แล้วค่อย os.replace
+            # เพื่อไม่ให้ session อื่นอ่านไฟล์ที่ยังเขียนไม่เสร็จ
+            fd, tmp_path = tempfile.mkstemp(dir=parquet_file.parent, prefix=f".{parquet_file.name}.", suffix=".tmp")
+            os.close(fd)
+            pd.read_csv(csv_file, encoding="utf-8-sig").to_parquet(
+                tmp_path, engine="pyarrow", compression="zstd"
+            )
+            os.replace(tmp_path, parquet_file)
+            tmp_path = None
+    except Exception:
+        return None
+    finally:
+        if tmp_path is not None:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+    return parquet_file
+
+def _read_table(csv_path):
+    parquet_file = _ensure_parquet(csv_path)
+    if parquet_file is not None:
+        try:
+            return pd.read_parquet(parquet_file, engine="pyarrow")
+        except Exception:
+            # ไฟล์ Parquet เสียหรืออ่านไม่ได้ ใช้ CSV ต้นฉบับแทน
+            pass
+    return pd.read_csv(csv_path, encoding="utf-8-sig")
+
+INS_DATABASE_FILE = "ins_database.csv"
+WARNINGS_DATABASE_FILE = "warnings_database.csv"
+
+def _file_mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+# ส่ง mtime ของไฟล์เป็นส่วนหนึ่งของ cache key เพื่อให้โหลดใหม่เมื่อไฟล์ CSV ถูกแก้ไข
+@st.cache_data(show_spinner=False)
+def _load_table(csv_path, mtime):
+    return _read_table(csv_path)
+
 def load_ins_database():
-    return pd.read_csv("ins_database.csv", encoding="utf-8-sig")
+    return _load_table(INS_DATABASE_FILE, _file_mtime(INS_DATABASE_FILE))
 
-@st.cache_data
 def load_warnings_database():
-    return pd.read_csv("warnings_database.csv", encoding="utf-8-sig")
+    return _load_table(WARNINGS_DATABASE_FILE, _file_mtime(WARNINGS_DATABASE_FILE))
+
+# ดัชนีเป็นตารางค้นหาแบบอ่านอย่างเดียว ใช้ cache_resource เพื่อคืนอ็อบเจ็กต์เดิมโดยไม่ต้อง pickle/copy ทุกครั้งที่เรียก
+@st.cache_resource(show_spinner=False)
+def _build_ins_index(csv_path, mtime):
+    ins_db = _load_table(csv_path, mtime)
+    # แถวที่ไม่มีหมายเลข INS ไม่ต้องเข้าดัชนี (กรองก่อน astype(str) ซึ่งใน pandas 2 จะได้ 'nan')
+    ins_db = ins_db[ins_db["ins_number"].notna()]
+    # normalize แบบ vectorized (เทียบเท่า normalize_ins) ครั้งเดียวต่อเวอร์ชันไฟล์
+    normalized = ins_db["ins_number"].astype(str).str.translate(_WS_TABLE).str.lower()
+    ins_index = {}
+    for key, row in zip(normalized, ins_db.to_dict("records")):
+        ins_index.setdefault(key, row)
+    return ins_index
+
+def load_ins_index():
+    """ดัชนี INS ที่ normalize แล้ว -> ข้อมูลแถวแรกที่ตรงกันในฐานข้อมูล"""
+    return _build_ins_index(INS_DATABASE_FILE, _file_mtime(INS_DATABASE_FILE))
+
+@st.cache_resource(show_spinner=False)
+def _build_warning_keyword_index(csv_path, mtime):
+    warnings_db = _load_table(csv_path, mtime)
+    if "keyword" not in warnings_db.columns:
+        return (), ()
+    keywords = tuple(warnings_db["keyword"].dropna().astype(str).str.strip())
+    return keywords, tuple(kw.lower() for kw in keywords)
+
+def _warning_keyword_index():
+    """คำสำคัญจากฐานข้อมูลคำเตือน พร้อมตัวพิมพ์เล็กสำหรับค้นหาคำแนะนำ"""
+    return _build_warning_keyword_index(WARNINGS_DATABASE_FILE, _file_mtime(WARNINGS_DATABASE_FILE))
+
+@st.cache_resource(show_spinner=False)
+def _build_warnings_index(csv_path, mtime):
+    warnings_db = _load_table(csv_path, mtime)
+    warnings_index = {}
+    for row in warnings_db.to_dict("records"):
+        keyword = row.get("keyword")
+        if isinstance(keyword, str):
+            warnings_index.setdefault(keyword.strip().lower(), row)
+    return warnings_index
+
+def load_warnings_index():
+    """ดัชนีคำสำคัญ (ตัดช่องว่าง/ตัวพิมพ์เล็ก) -> ข้อมูลแถวแรกในฐานข้อมูลคำเตือน"""
+    return _build_warnings_index(WARNINGS_DATABASE_FILE, _file_mtime(WARNINGS_DATABASE_FILE))
 
 # Define standard colors
 COLOR_SUCCESS = RGBColor.from_string("006400")  # Dark Green
@@ -32,11 +136,40 @@ COLOR_ALERT_RED = RGBColor.from_string("B91C1C")
 TARGET_FONT_NAME = 'TH Sarabun New'
 TARGET_FONT_SIZE = Pt(14)
 
+# ระยะห่างและขนาดที่ใช้ซ้ำในรายงาน Word สร้างครั้งเดียวตอน import
+_PT2, _PT4, _PT6, _PT10, _PT12, _PT18 = Pt(2), Pt(4), Pt(6), Pt(10), Pt(12), Pt(18)
+_IN_ORYOR, _IN_GDA, _IN_NUTRITION = Inches(1.2), Inches(1.3), Inches(1.7)
+# ระยะก่อนหัวข้อแต่ละส่วน = ระยะเดิมของ Heading 2 (10pt) + บรรทัดว่างขนาด 14pt ที่เคยใช้คั่นส่วน
+_SECTION_SPACE_BEFORE = Pt(30)
+
 ASSET_DIR = Path(__file__).parent / "assets"
 GDA_IMAGE_PATH = ASSET_DIR / "gda.png"
 NUTRITION_IMAGE_PATH = ASSET_DIR / "nutrition.png"
 ORYOR_IMAGE_PATH = ASSET_DIR / "oryor.png"
 
+# ไฟล์ภาพใน assets/ ไม่เปลี่ยนระหว่างรัน ตรวจสอบครั้งเดียวตอน import
+_ORYOR_EXISTS = ORYOR_IMAGE_PATH.exists()
+_GDA_EXISTS = GDA_IMAGE_PATH.exists()
+_NUTRITION_EXISTS = NUTRITION_IMAGE_PATH.exists()
+
+# ประเภทอาหารที่ไม่ต้องแสดงฉลาก GDA (ประเภทอื่นต้องแสดง GDA และตารางโภชนาการ)
+NON_GDA_TYPES = frozenset({
+    "อื่นๆ (ที่ไม่ใช่อาหารควบคุมเฉพาะ)",
+    "วุ้นสำเร็จรูป",
+    "ผลิตภัณฑ์เสริมอาหาร",
+    "ชาจากพืช",
+})
+# ประเภทที่ต้องแสดง 'บริโภคแต่น้อยและออกกำลังกายเพื่อสุขภาพ'
+SNACK_CHOCO_BAKERY = frozenset({
+    "อาหารขบเคี้ยว ตัวอย่างเช่น มันฝรั่งทอดกรอบ ข้าวโพดอบกรอบ ข้าวเกรียบชนิดต่างๆ ถั่วลิสงส์อบปรุงรส สาหร่ายทอดอบกรอบ ปลาหมึกแผ่นอบกรอบ หมูแผ่นอบกรอบ",
+    "ช็อกโกแลต และขนมหวานรสช็อกโกแลต",
+    "ผลิตภัณฑ์ขนมอบ ตัวอย่างเช่น ขนมปังกรอบ ขนมขาไก่ เวเฟอร์สอดไส้ คุกกี้ เค้ก ขนมไหว้พระจันทร์ เอแคลร์ ครัวซองท์ พายไส้ต่างๆ",
+})
+CAFFEINE_TEA_COFFEE = frozenset({
+    "ชาปรุงสำเร็จ ทั้งชนิดเหลวและชนิดแห้ง",
+    "กาแฟปรุงสำเร็จ ทั้งชนิดเหลวและชนิดแห้ง",
+})
+
 BOXED_LABEL_TEXTS = {
     "บริโภคแต่น้อยและออกกำลังกายเพื่อสุขภาพ",
 }
@@ -48,7 +181,20 @@ PREVIEW_EXCLUDE_PREFIXES = [
     "เลขสารบบอาหาร ในเครื่องหมายแสดงเลขสารบบอาหาร",
 ]
 
-PREVIEW_EXCLUDE_PREFIXES_NORMALIZED = [prefix.lower() for prefix in PREVIEW_EXCLUDE_PREFIXES]
+PREVIEW_EXCLUDE_PREFIXES_NORMALIZED = tuple(prefix.lower() for prefix in PREVIEW_EXCLUDE_PREFIXES)
+
+_PLACEHOLDER_TOKEN = "[กรุณากรอก"
+
+# ข้อความคำเตือนที่แสดงแยกในตัวอย่างฉลาก ตรวจตามลำดับ ใช้รายการแรกที่พบคำครบทุกคำ
+# (คำที่ต้องพบ, ตำแหน่ง, แสดงในกรอบ, badge_variant, ข้อความคงที่ หรือ None เพื่อดึงข้อความในเครื่องหมาย '')
+PREVIEW_SPECIAL_LABELS = (
+    (("คำเตือน", "มีกาเฟอีน"), "top", False, None, "มีกาเฟอีน"),
+    (("คำเตือน", "ตัวอักษรขนาดไม่เล็กกว่า 1.5 มม"), "bottom", True, None, None),
+    (("เด็กและสตรีมีครรภ์",), "bottom", False, None, None),
+    (("ควรกินอาหารหลากหลาย",), "bottom", False, None, None),
+    (("ไม่มีผลในการป้องกัน",), "bottom", True, None, None),
+    (("ห้ามดื่มเกินวันละ",), "bottom", True, "warning", None),
+)
 
 PREVIEW_POST_INGREDIENT_KEYWORDS = [
     "วัตถุเจือปนอาหาร",
@@ -65,38 +211,56 @@ FONT_CANDIDATES = [
     "tahoma.ttf",
 ]
 
-def _load_overlay_font(size):
+def _resolve_font_path():
     for font_path in FONT_CANDIDATES:
+        if Path(font_path).exists():
+            return font_path
+    return None
+
+# ตรวจหาไฟล์ฟอนต์ครั้งเดียวตอน import แทนการ stat ไฟล์ทุกครั้งที่สร้าง badge
+_RESOLVED_FONT_PATH = _resolve_font_path()
+
+@functools.lru_cache(maxsize=32)
+def _load_overlay_font(size):
+    candidates = FONT_CANDIDATES
+    if _RESOLVED_FONT_PATH:
+        candidates = [_RESOLVED_FONT_PATH] + [c for c in FONT_CANDIDATES if c != _RESOLVED_FONT_PATH]
+    for font_path in candidates:
         try:
-            path_obj = Path(font_path)
-            if path_obj.exists():
-                return ImageFont.truetype(str(path_obj), size=size)
             return ImageFont.truetype(font_path, size=size)
         except (OSError, IOError):
             continue
     return ImageFont.load_default()
 
+@functools.lru_cache(maxsize=1)
+def _oryor_base():
+    """Decode the อย. mark once; callers must copy before drawing on it."""
+    if not _ORYOR_EXISTS:
+        return None
+    try:
+        return Image.open(ORYOR_IMAGE_PATH).convert("RGBA")
+    except (OSError, IOError):
+        return None
+
 def generate_oryor_badge(reg_number):
     text = _clean_text(reg_number)
     if not text:
         return None
-    if not ORYOR_IMAGE_PATH.exists():
+    base_image = _oryor_base()
+    if base_image is None:
         return None
-    try:
-        base_image = Image.open(ORYOR_IMAGE_PATH).convert("RGBA")
-    except (OSError, IOError):
-        return None
-    badge = base_image.copy()
-    draw = ImageDraw.Draw(badge)
-    font_size = max(18, int(badge.width * 0.22))
+    # วาดแถบพื้นหลังและข้อความบน layer โปร่งใส แล้ว composite ลงบนภาพต้นฉบับที่แคชไว้
+    overlay = Image.new("RGBA", base_image.size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(overlay)
+    font_size = max(18, int(overlay.width * 0.22))
     font = _load_overlay_font(font_size)
     text_bbox = draw.textbbox((0, 0), text, font=font)
     text_width = text_bbox[2] - text_bbox[0]
     text_height = text_bbox[3] - text_bbox[1]
-    horizontal_margin = max(6, int(badge.width * 0.08))
-    vertical_margin = max(4, int(badge.height * 0.07))
-    x = max(horizontal_margin, (badge.width - text_width) / 2)
-    y = badge.height - text_height - vertical_margin
+    horizontal_margin = max(6, int(overlay.width * 0.08))
+    vertical_margin = max(4, int(overlay.height * 0.07))
+    x = max(horizontal_margin, (overlay.width - text_width) / 2)
+    y = overlay.height - text_height - vertical_margin
     if y < horizontal_margin:
         y = horizontal_margin
     background_padding = int(text_height * 0.35)
@@ -109,67 +273,90 @@ def generate_oryor_badge(reg_number):
         fill=(255, 255, 255, 220),
     )
     draw.text((x, y), text, font=font, fill=(0, 0, 0, 255))
-    return badge
+    return Image.alpha_composite(base_image, overlay)
 
 def prepare_preview_image_entries(registration_number, include_gda=True, include_nutrition=True):
+    """คืนรายการรูปตัวอย่าง โดย ``image`` เป็น path ของไฟล์ใน assets/ เสมอ"""
     entries = []
     # ยกเลิกการทำ overlay เลขสารบบอาหารบนรูปเครื่องหมาย อย. แสดงรูปมาตรฐานเท่านั้น
-    if ORYOR_IMAGE_PATH.exists():
+    if _ORYOR_EXISTS:
         entries.append(
             {
                 "image": ORYOR_IMAGE_PATH,
                 "caption": "เครื่องหมาย อย.",
-                "width": Inches(1.2),
+                "width": _IN_ORYOR,
             }
         )
-    if GDA_IMAGE_PATH.exists():
+    if _GDA_EXISTS:
         if include_gda:
             entries.append(
                 {
                     "image": GDA_IMAGE_PATH,
                     "caption": "ฉลาก GDA",
-                    "width": Inches(1.3),
+                    "width": _IN_GDA,
                 }
             )
-    if NUTRITION_IMAGE_PATH.exists() and include_nutrition:
+    if _NUTRITION_EXISTS and include_nutrition:
         entries.append(
             {
                 "image": NUTRITION_IMAGE_PATH,
                 "caption": "ตารางโภชนาการ\nสามารถกรอกข้อมูลและดาวน์โหลดฉลากโภชนาการและฉลาก GDA ที่สมบูรณ์ได้ที่เว็ปไซต์กองอาหาร (https://fdaconnect.fda.moph.go.th/NF_GDA/)",
-                "width": Inches(1.7),
+                "width": _IN_NUTRITION,
             }
         )
     return entries
 
+@functools.lru_cache(maxsize=8)
+def _image_file_bytes(image_path):
+    """อ่านไฟล์รูปในโฟลเดอร์ assets ครั้งเดียว แล้วใช้ซ้ำในทุกรายงาน"""
+    return Path(image_path).read_bytes()
+
+@st.cache_resource(show_spinner=False)
+def _cached_preview_images(include_gda, include_nutrition):
+    """รูปตัวอย่างสำหรับหน้าจอ: (bytes ของไฟล์, คำบรรยาย) ใช้ซ้ำข้ามการ rerun
+
+    รูปไม่ขึ้นกับเลขสารบบอาหาร จึง cache ตามตัวเลือกการแสดงรูปเท่านั้น
+    """
+    return tuple(
+        (_image_file_bytes(entry["image"]), entry["caption"])
+        for entry in prepare_preview_image_entries(
+            None, include_gda=include_gda, include_nutrition=include_nutrition
+        )
+    )
+
+_Q_TCBORDERS = qn('w:tcBorders')
+_Q_TCMAR = qn('w:tcMar')
+_Q_XML_SPACE = qn('xml:space')
+
+@functools.lru_cache(maxsize=32)
+def _tc_borders_xml(color, size):
+    edges = "".join(
+        f'<w:{edge} w:val="single" w:sz="{size}" w:color="{color}"/>'
+        for edge in ("top", "left", "bottom", "right")
+    )
+    return f"<w:tcBorders {nsdecls('w')}>{edges}</w:tcBorders>"
+
+@functools.lru_cache(maxsize=32)
+def _tc_margins_xml(top, start, bottom, end):
+    margins = "".join(
+        f'<w:{margin_name} w:w="{value}" w:type="dxa"/>'
+        for margin_name, value in (("top", top), ("start", start), ("bottom", bottom), ("end", end))
+    )
+    return f"<w:tcMar {nsdecls('w')}>{margins}</w:tcMar>"
+
 def set_cell_border(cell, color="FF0000", size=12):
-    tc = cell._tc
-    tcPr = tc.get_or_add_tcPr()
-    tcBorders = tcPr.find(qn('w:tcBorders'))
-    if tcBorders is None:
-        tcBorders = OxmlElement('w:tcBorders')
-        tcPr.append(tcBorders)
-    for edge in ("top", "left", "bottom", "right"):
-        edge_element = tcBorders.find(qn(f"w:{edge}"))
-        if edge_element is None:
-            edge_element = OxmlElement(f"w:{edge}")
-            tcBorders.append(edge_element)
-        edge_element.set(qn("w:val"), "single")
-        edge_element.set(qn("w:sz"), str(size))
-        edge_element.set(qn("w:color"), color)
+    tcPr = cell._tc.get_or_add_tcPr()
+    existing = tcPr.find(_Q_TCBORDERS)
+    if existing is not None:
+        tcPr.remove(existing)
+    tcPr.append(parse_xml(_tc_borders_xml(color, size)))
+
 def set_cell_margins(cell, top=60, start=120, bottom=60, end=120):
-    tc = cell._tc
-    tcPr = tc.get_or_add_tcPr()
-    tcMar = tcPr.find(qn('w:tcMar'))
-    if tcMar is None:
-        tcMar = OxmlElement('w:tcMar')
-        tcPr.append(tcMar)
-    for margin_name, value in (('top', top), ('start', start), ('bottom', bottom), ('end', end)):
-        mar = tcMar.find(qn(f'w:{margin_name}'))
-        if mar is None:
-            mar = OxmlElement(f'w:{margin_name}')
-            tcMar.append(mar)
-        mar.set(qn('w:w'), str(value))
-        mar.set(qn('w:type'), 'dxa')
+    tcPr = cell._tc.get_or_add_tcPr()
+    existing = tcPr.find(_Q_TCMAR)
+    if existing is not None:
+        tcPr.remove(existing)
+    tcPr.append(parse_xml(_tc_margins_xml(top, start, bottom, end)))
 
 
 MANUFACTURER_ADDRESS_PLACEHOLDER = "[กรุณากรอกที่ตั้งตามใบอนุญาต]"
@@ -185,38 +372,124 @@ MANUFACTURER_ROLE_PLACEHOLDERS = {
     "แบ่งบรรจุ": "[กรุณากรอกชื่อผู้แบ่งบรรจุ]",
 }
 
+_WS_RE = re.compile(r"\s+")
+# ตารางลบช่องว่างทุกชนิด (ชุดเดียวกับ \s ของ re; อักขระช่องว่าง Unicode ตัวสุดท้ายคือ U+3000)
+_WS_TABLE = dict.fromkeys(i for i in range(0x3001) if chr(i).isspace())
+
+@functools.lru_cache(maxsize=4096)
+def _clean_text_cached(value: str) -> str:
+    return _WS_RE.sub(" ", value.strip())
+
 def _clean_text(value):
     if isinstance(value, str):
-        cleaned = re.sub(r"\s+", " ", value.strip())
-        return cleaned
+        # isprintable() เป็น False สำหรับ whitespace ทุกชนิดยกเว้นช่องว่างปกติ จึงคืนค่าเดิมได้ทันที
+        # เมื่อไม่มีช่องว่างซ้อนหรือช่องว่างหัวท้าย
+        if (
+            value.isprintable()
+            and "  " not in value
+            and not value.startswith(" ")
+            and not value.endswith(" ")
+        ):
+            return value
+        return _clean_text_cached(value)
     return ""
 
+_BOXED_MAP = {
+    _clean_text(text).lower(): text for text in BOXED_LABEL_TEXTS if _clean_text(text)
+}
+_BOXED_TARGETS = tuple(_BOXED_MAP)
+
+_FOREIGN_MANUFACTURER_TEMPLATE = "ผลิตโดย {name} ประเทศ {country}"
+_MANUFACTURER_CONTACT_TEMPLATE = "{prefix}: {name} {address}"
+
 def format_foreign_manufacturer_section(foreign_name, foreign_country):
-    name_display = _clean_text(foreign_name) or "[กรุณากรอกชื่อผู้ผลิตในต่างประเทศ]"
-    country_display = _clean_text(foreign_country) or "[กรุณากรอกประเทศผู้ผลิต]"
-    return f"ผลิตโดย {name_display} ประเทศ {country_display}"
+    return _FOREIGN_MANUFACTURER_TEMPLATE.format_map({
+        "name": _clean_text(foreign_name) or "[กรุณากรอกชื่อผู้ผลิตในต่างประเทศ]",
+        "country": _clean_text(foreign_country) or "[กรุณากรอกประเทศผู้ผลิต]",
+    })
 
 def format_manufacturer_contact(role_key, name, address):
-    prefix = MANUFACTURER_ROLE_LABELS.get(role_key, "ผู้ผลิต/ผู้นำเข้า")
-    name_placeholder = MANUFACTURER_ROLE_PLACEHOLDERS.get(role_key, "[กรุณากรอกชื่อผู้ผลิต/ผู้นำเข้า]")
-    address_placeholder = MANUFACTURER_ADDRESS_PLACEHOLDER
+    return _MANUFACTURER_CONTACT_TEMPLATE.format_map({
+        "prefix": MANUFACTURER_ROLE_LABELS.get(role_key, "ผู้ผลิต/ผู้นำเข้า"),
+        "name": _clean_text(name)
+        or MANUFACTURER_ROLE_PLACEHOLDERS.get(role_key, "[กรุณากรอกชื่อผู้ผลิต/ผู้นำเข้า]"),
+        "address": _clean_text(address) or MANUFACTURER_ADDRESS_PLACEHOLDER,
+    })
+
+_THEME_FONT_ATTRS = tuple(qn(f"w:{attr}") for attr in ("asciiTheme", "hAnsiTheme", "eastAsiaTheme", "cstheme"))
+
+def _apply_report_font(style):
+    """ตั้งฟอนต์รายงานให้ style (รวม eastAsia/cs สำหรับอักษรไทย) และตัดฟอนต์จากธีมออก"""
+    style.font.name = TARGET_FONT_NAME
+    style.font.size = TARGET_FONT_SIZE
+    rfonts = style.element.rPr.rFonts
+    for attr in _THEME_FONT_ATTRS:
+        rfonts.attrib.pop(attr, None)
+    rfonts.set(qn("w:eastAsia"), TARGET_FONT_NAME)
+    rfonts.set(qn("w:cs"), TARGET_FONT_NAME)
+
+def _run_properties_xml(bold, italic, color):
+    bold_xml = "<w:b/>" if bold else '<w:b w:val="0"/>'
+    italic_xml = "<w:i/>" if italic else '<w:i w:val="0"/>'
+    color_xml = f'<w:color w:val="{color}"/>' if color else ""
+    return f"<w:rPr>{bold_xml}{italic_xml}{color_xml}</w:rPr>"
+
+@functools.lru_cache(maxsize=32)
+def _paragraph_template(bold, italic, color, alignment):
+    """แม่แบบ <w:p> ตามรูปแบบที่ add_styled_paragraph สร้าง (parse ครั้งเดียวต่อรูปแบบ แล้ว deepcopy ใช้)"""
+    return parse_xml(
+        f'<w:p {nsdecls("w")}><w:pPr><w:spacing w:after="80"/><w:jc w:val="{alignment.xml_value}"/></w:pPr>'
+        f"<w:r>{_run_properties_xml(bold, italic, color)}<w:t/></w:r></w:p>"
+    )
+
+@functools.lru_cache(maxsize=8)
+def _heading_template(style_id, space_before):
+    """แม่แบบ <w:p> ของหัวข้อตามที่ add_styled_heading สร้าง"""
+    before_xml = f' w:before="{space_before.twips}"' if space_before is not None else ""
+    return parse_xml(
+        f'<w:p {nsdecls("w")}><w:pPr><w:pStyle w:val="{style_id}"/><w:spacing{before_xml} w:after="120"/></w:pPr>'
+        "<w:r><w:rPr><w:b/></w:rPr><w:t/></w:r></w:p>"
+    )
+
+# อักขระที่ python-docx แปลงเป็น <w:tab/>/<w:br/> ต้องให้ add_run จัดการเอง
+_RUN_SPECIAL_CHARS = frozenset("\t\n\r")
 
-    name_display = _clean_text(name) or name_placeholder
-    address_display = _clean_text(address) or address_placeholder
+def _uses_plain_run(text):
+    """ข้อความที่ใส่ใน <w:t> เดียวได้ตรงๆ (ไม่ว่าง และไม่มีแท็บ/ขึ้นบรรทัด)"""
+    return bool(text) and _RUN_SPECIAL_CHARS.isdisjoint(text)
 
-    return f"{prefix}: {name_display} {address_display}"
+def _insert_template_paragraph(document, template, text):
+    # คัดลอกแม่แบบ XML แทนการตั้งค่าผ่าน property ของ python-docx ทีละค่า
+    p_element = deepcopy(template)
+    t_element = p_element[-1][-1]
+    t_element.text = text
+    if len(text.strip()) < len(text):
+        t_element.set(_Q_XML_SPACE, "preserve")
+    document.element.body._insert_p(p_element)
+    return Paragraph(p_element, document._body)
 
 # Helper function to add a styled heading with numbering
-def add_styled_heading(document, text, level=1, numbered=True, section_number=""):
+def add_styled_heading(document, text, level=1, numbered=True, section_number="", space_before=None):
     prefix = f"{section_number} " if numbered and section_number else ""
-    heading = document.add_heading(f"{prefix}{text}", level=level)
+    text = f"{prefix}{text}"
+    if _uses_plain_run(text):
+        # ค้นหา style ด้วยชื่อครั้งเดียว แทน add_heading ที่ต้องไล่หา default style ทุกครั้ง
+        style_id = document.styles[f"Heading {level}"].style_id
+        return _insert_template_paragraph(document, _heading_template(style_id, space_before), text)
+    heading = document.add_heading(text, level=level)
     for run in heading.runs:
         run.font.bold = True 
-    heading.paragraph_format.space_after = Pt(6)
+    if space_before is not None:
+        heading.paragraph_format.space_before = space_before
+    heading.paragraph_format.space_after = _PT6
     return heading
 
 # Helper function to add a paragraph with specific styling
 def add_styled_paragraph(document, text, bold=False, italic=False, color=COLOR_BLACK, alignment=WD_ALIGN_PARAGRAPH.LEFT):
+    text = str(text)
+    if _uses_plain_run(text):
+        template = _paragraph_template(bool(bold), bool(italic), str(color) if color else None, alignment)
+        return _insert_template_paragraph(document, template, text)
     p = document.add_paragraph()
     run = p.add_run(text)
     run.bold = bold
@@ -224,25 +497,48 @@ def add_styled_paragraph(document, text, bold=False, italic=False, color=COLOR_B
     if color:
         run.font.color.rgb = color
     p.alignment = alignment
-    p.paragraph_format.space_after = Pt(4)
+    p.paragraph_format.space_after = _PT4
     return p
 
+def _append_paragraph_runs(document, items, bold=False):
+    """เพิ่มย่อหน้าละรายการ โดย parse XML ของรายการที่ติดกันในครั้งเดียว"""
+    run_properties = _run_properties_xml(bold, False, COLOR_BLACK)
+    body = document.element.body
+    pending = []
+
+    def _flush():
+        if pending:
+            fragment = parse_xml(f"<w:body {nsdecls('w')}>{''.join(pending)}</w:body>")
+            for paragraph in list(fragment):
+                body._insert_p(paragraph)
+            del pending[:]
+
+    for item in items:
+        text = str(item)
+        if not _uses_plain_run(text):
+            # แท็บ/ขึ้นบรรทัดต้องให้ add_run แปลงเป็น <w:tab/>/<w:br/>
+            _flush()
+            add_styled_paragraph(document, text, bold=bold)
+            continue
+        space = ' xml:space="preserve"' if len(text.strip()) < len(text) else ""
+        pending.append(
+            '<w:p><w:pPr><w:spacing w:after="80"/><w:jc w:val="left"/></w:pPr>'
+            f'<w:r>{run_properties}<w:t{space}>{html.escape(text, quote=False)}</w:t></w:r></w:p>'
+        )
+    _flush()
+
+# run ของฟิลด์เลขหน้า (PAGE) สร้างครั้งเดียว แล้ว deepcopy ใส่ footer ของแต่ละ section
+_PAGE_NUMBER_RUN = parse_xml(
+    f'<w:r {nsdecls("w")}><w:fldChar w:fldCharType="begin"/>'
+    '<w:instrText xml:space="preserve">PAGE</w:instrText><w:fldChar w:fldCharType="end"/></w:r>'
+)
+
 def add_page_numbers(document):
     for section in document.sections:
         footer = section.footer
         p = footer.paragraphs[0] if footer.paragraphs else footer.add_paragraph()
         p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        fldChar1 = OxmlElement('w:fldChar')
-        fldChar1.set(qn('w:fldCharType'), 'begin')
-        instrText = OxmlElement('w:instrText')
-        instrText.set(qn('xml:space'), 'preserve')
-        instrText.text = "PAGE"
-        fldChar2 = OxmlElement('w:fldChar')
-        fldChar2.set(qn('w:fldCharType'), 'end')
-        run = p.add_run()
-        run.element.append(fldChar1)
-        run.element.append(instrText)
-        run.element.append(fldChar2)
+        p._p.append(deepcopy(_PAGE_NUMBER_RUN))
 
 def get_net_content_placeholder(food_consistency):
     """Return a placeholder text for net content based on food consistency."""
@@ -288,50 +584,52 @@ def build_label_preview_context(
         cleaned = _clean_text(value)
         return cleaned.lower() if cleaned else ""
 
-    boxed_map = {normalize_entry(text): text for text in BOXED_LABEL_TEXTS}
-    boxed_targets = set(boxed_map.keys())
     registered_entries = set()
     registered_prefixes = set()
 
-    def register_text(value):
-        normalized = normalize_entry(value)
-        if normalized:
-            registered_entries.add(normalized)
-
-    def register_prefix(label):
-        cleaned_label = _clean_text(label)
-        if cleaned_label:
-            registered_prefixes.add(cleaned_label.lower())
-            register_text(cleaned_label)
+    def cached_normalized(line, key, source):
+        # ค่าที่ normalize แล้วถูกเก็บไว้ใน line ตอน append_line ใช้ซ้ำได้โดยไม่ต้องคำนวณใหม่
+        normalized = line.get(key)
+        if normalized is None:
+            normalized = normalize_entry(source)
+        return normalized
+
+    def line_fingerprints(line):
+        # ข้อความที่ normalize แล้วของบรรทัด (ค่า และ "label: ค่า") ใช้ตรวจสอบรายการซ้ำ
+        fingerprints = line.get("_fingerprints")
+        if fingerprints is None:
+            candidates = [cached_normalized(line, "_normalized_value", line["value"])]
+            if line["label"]:
+                candidates.append(normalize_entry(f"{line['label']}: {line['value']}"))
+            fingerprints = frozenset(text for text in candidates if text)
+        return fingerprints
 
     def register_line(line):
         if line["label"]:
-            register_prefix(line["label"])
-            register_text(f"{line['label']}: {line['value']}")
-        register_text(line["value"])
+            normalized_label = cached_normalized(line, "_normalized_label", line["label"])
+            if normalized_label:
+                registered_prefixes.add(normalized_label)
+                registered_entries.add(normalized_label)
+        registered_entries.update(line_fingerprints(line))
 
     def line_exists(line):
-        checks = [line["value"]]
-        if line["label"]:
-            checks.append(f"{line['label']}: {line['value']}")
-        return any(normalize_entry(text) in registered_entries for text in checks)
+        return not line_fingerprints(line).isdisjoint(registered_entries)
 
     def normalize_line(line):
+        """เติมทุกฟิลด์ของบรรทัด (label, display_value, box, badge_variant, is_placeholder)
+        เพื่อให้ฝั่งแสดงผลอ่านค่าได้โดยตรงไม่ต้องใช้ .get"""
         line.setdefault("label", None)
         line.setdefault("is_placeholder", False)
-        normalized_value = normalize_entry(line["value"])
-        display_value = line.get("display_value", line["value"])
-        for boxed_key in boxed_targets:
-            if boxed_key and boxed_key in normalized_value:
-                line["box"] = True
-                line["is_placeholder"] = False
-                line["display_value"] = boxed_map.get(boxed_key, display_value)
-                break
+        line.setdefault("badge_variant", None)
+        normalized_value = cached_normalized(line, "_normalized_value", line["value"])
+        boxed_key = next((key for key in _BOXED_TARGETS if key in normalized_value), None)
+        if boxed_key is not None:
+            line["box"] = True
+            line["is_placeholder"] = False
+            line["display_value"] = _BOXED_MAP[boxed_key]
         else:
-            line["box"] = line.get("box", False)
-            line["display_value"] = display_value
-        if line.get("box") and "display_value" not in line:
-            line["display_value"] = line["value"]
+            line.setdefault("box", False)
+            line.setdefault("display_value", line["value"])
         return line
 
     core_lines = []
@@ -339,7 +637,11 @@ def build_label_preview_context(
     extra_lines = []
 
     def append_line(line, target="core"):
+        line["_normalized_value"] = normalize_entry(line["value"])
+        if line.get("label"):
+            line["_normalized_label"] = normalize_entry(line["label"])
         line = normalize_line(line)
+        line["_fingerprints"] = line_fingerprints(line)
         if not line_exists(line):
             if target == "core":
                 core_lines.append(line)
@@ -353,7 +655,7 @@ def build_label_preview_context(
         cleaned_value = _clean_text(value)
         if cleaned_value:
             is_placeholder = False
-            if detect_placeholder and "[กรุณากรอก" in cleaned_value:
+            if detect_placeholder and _PLACEHOLDER_TOKEN in cleaned_value:
                 is_placeholder = True
             line = {
                 "label": label,
@@ -428,7 +730,7 @@ def build_label_preview_context(
 
     # แสดงบรรทัด "ข้อมูลสำหรับผู้แพ้อาหาร" ในตัวอย่างฉลาก เฉพาะเมื่ออยู่ในรายการ "ข้อมูลที่ต้องมีในฉลาก"
     requires_allergen_note = any(
-        "ข้อมูลสำหรับผู้แพ้อาหาร" in str(lbl) for lbl in (ordered_labels or [])
+        "ข้อมูลสำหรับผู้แพ้อาหาร" in lbl for lbl in (ordered_labels or [])
     )
     if requires_allergen_note and has_allergen and allergen_groups:
         append_line(
@@ -459,88 +761,40 @@ def build_label_preview_context(
             return _clean_text(parts[1])
         return _clean_text(label_text)
 
+    def match_special_label(label, normalized_label):
+        for markers, position, boxed, badge_variant, fixed_text in PREVIEW_SPECIAL_LABELS:
+            if all(marker in normalized_label for marker in markers):
+                text = fixed_text or extract_quoted_text(label)
+                special_line = {
+                    "label": None,
+                    "value": text,
+                    "display_value": text,
+                    "is_placeholder": False,
+                    "box": boxed,
+                    "badge_variant": badge_variant,
+                }
+                return position, special_line
+        return None
+
     for label in ordered_labels:
         normalized_label = normalize_entry(label)
         if not normalized_label:
             continue
-        if "คำเตือน" in normalized_label and "มีกาเฟอีน" in normalized_label:
-            caffeine_line = {
-                "label": None,
-                "value": "มีกาเฟอีน",
-                "display_value": "มีกาเฟอีน",
-                "is_placeholder": False,
-                "box": False,
-            }
-            register_line(caffeine_line)
-            top_lines.append(caffeine_line)
-            continue
-        if "คำเตือน" in normalized_label and "ตัวอักษรขนาดไม่เล็กกว่า 1.5 มม" in normalized_label:
-            warning_text = extract_quoted_text(label)
-            warning_line = {
-                "label": None,
-                "value": warning_text,
-                "display_value": warning_text,
-                "is_placeholder": False,
-                "box": True,
-            }
-            register_line(warning_line)
-            bottom_lines.append(warning_line)
-            continue
-        if "เด็กและสตรีมีครรภ์" in normalized_label:
-            warning_text = extract_quoted_text(label)
-            warning_line = {
-                "label": None,
-                "value": warning_text,
-                "display_value": warning_text,
-                "is_placeholder": False,
-                "box": False,
-            }
-            register_line(warning_line)
-            bottom_lines.append(warning_line)
-            continue
-        if "ควรกินอาหารหลากหลาย" in normalized_label:
-            warning_text = extract_quoted_text(label)
-            warning_line = {
-                "label": None,
-                "value": warning_text,
-                "display_value": warning_text,
-                "is_placeholder": False,
-                "box": False,
-            }
-            register_line(warning_line)
-            bottom_lines.append(warning_line)
-            continue
-        if "ไม่มีผลในการป้องกัน" in normalized_label:
-            warning_text = extract_quoted_text(label)
-            warning_line = {
-                "label": None,
-                "value": warning_text,
-                "display_value": warning_text,
-                "is_placeholder": False,
-                "box": True,
-            }
-            register_line(warning_line)
-            bottom_lines.append(warning_line)
-            continue
-        if "ห้ามดื่มเกินวันละ" in normalized_label:
-            warning_text = extract_quoted_text(label)
-            warning_line = {
-                "label": None,
-                "value": warning_text,
-                "display_value": warning_text,
-                "is_placeholder": False,
-                "box": True,
-                "badge_variant": "warning",
-            }
-            register_line(warning_line)
-            bottom_lines.append(warning_line)
+        special = match_special_label(label, normalized_label)
+        if special:
+            position, special_line = special
+            register_line(special_line)
+            if position == "top":
+                top_lines.append(special_line)
+            else:
+                bottom_lines.append(special_line)
             continue
         if (
             normalized_label in registered_entries
-            or any(normalized_label.startswith(prefix) for prefix in registered_prefixes)
+            or normalized_label.startswith(tuple(registered_prefixes))
         ):
             continue
-        if any(normalized_label.startswith(prefix) for prefix in PREVIEW_EXCLUDE_PREFIXES_NORMALIZED):
+        if normalized_label.startswith(PREVIEW_EXCLUDE_PREFIXES_NORMALIZED):
             continue
         append_line(
             {
@@ -553,47 +807,47 @@ def build_label_preview_context(
             else "extra",
         )
 
-    additive_lines = [
-        line for line in post_ingredient_lines if "วัตถุเจือปนอาหาร" in line.get("value", "")
-    ]
-    # ตัด prefix "วัตถุเจือปนอาหาร:" ออกจากตัวอย่างฉลาก (เช่น บรรทัดสี)
-    for _line in additive_lines:
-        _val = str(_line.get("value", ""))
-        if _val.startswith("วัตถุเจือปนอาหาร:"):
-            _line["display_value"] = _val.split(":", 1)[1].strip()
-    flavor_lines = [
-        line
-        for line in post_ingredient_lines
-        if any(keyword in line.get("value", "") for keyword in ("แต่งกลิ่น", "แต่งรส", "การแต่ง"))
-    ]
-    allergen_lines = [
-        line for line in post_ingredient_lines if "ข้อมูลสำหรับผู้แพ้อาหาร" in line.get("value", "")
-    ]
-    other_post_lines = [
-        line
-        for line in post_ingredient_lines
-        if line not in additive_lines and line not in flavor_lines and line not in allergen_lines
-    ]
+    additive_lines = []
+    flavor_lines = []
+    allergen_lines = []
+    other_post_lines = []
+    for line in post_ingredient_lines:
+        value = line["value"]
+        if "วัตถุเจือปนอาหาร" in value:
+            # ตัด prefix "วัตถุเจือปนอาหาร:" ออกจากตัวอย่างฉลาก (เช่น บรรทัดสี)
+            if value.startswith("วัตถุเจือปนอาหาร:"):
+                line["display_value"] = value.split(":", 1)[1].strip()
+            additive_lines.append(line)
+        elif any(keyword in value for keyword in ("แต่งกลิ่น", "แต่งรส", "การแต่ง")):
+            flavor_lines.append(line)
+        elif "ข้อมูลสำหรับผู้แพ้อาหาร" in value:
+            allergen_lines.append(line)
+        else:
+            other_post_lines.append(line)
     ordered_post_ingredient_lines = (
         additive_lines + flavor_lines + allergen_lines + other_post_lines
     )
 
-    preview_lines = list(top_lines)
+    parts = [top_lines]
+    added_post = False
     for line in core_lines:
-        preview_lines.append(line)
-        if line.get("label") == "ส่วนประกอบ":
-            preview_lines.extend(ordered_post_ingredient_lines)
-
-    added_post = len(ordered_post_ingredient_lines) > 0 and any(
-        line.get("label") == "ส่วนประกอบ" for line in core_lines
-    )
+        parts.append((line,))
+        if line["label"] == "ส่วนประกอบ":
+            parts.append(ordered_post_ingredient_lines)
+            added_post = True
     if not added_post:
-        preview_lines.extend(ordered_post_ingredient_lines)
-    preview_lines.extend(extra_lines)
-    preview_lines.extend(bottom_lines)
+        parts.append(ordered_post_ingredient_lines)
+    parts.append(extra_lines)
+    parts.append(bottom_lines)
+    preview_lines = list(chain.from_iterable(parts))
+    # escape HTML ครั้งเดียวตอนสร้าง context ฝั่งแสดงผลนำไปต่อสตริงได้ทันที
+    for line in preview_lines:
+        line["escaped_label"] = html.escape(line["label"]) if line["label"] else ""
+        line["escaped_display"] = html.escape(line["display_value"])
 
     return {
         "title": title_display,
+        "escaped_title": html.escape(title_display),
         "title_is_placeholder": title_is_placeholder,
         "core_lines": core_lines,
         "extra_lines": extra_lines,
@@ -604,19 +858,18 @@ def generate_label_word_report(report_data):
     """สร้างรายงาน Word สำหรับการตรวจสอบฉลากอาหาร"""
     document = Document()
     
-    # Set default font for the document
+    # Set default font for the document (ทุก run สืบทอดฟอนต์จาก style ไม่ต้องไล่ตั้งทีหลัง)
     style = document.styles['Normal']
-    font = style.font
-    font.name = TARGET_FONT_NAME
-    font.size = TARGET_FONT_SIZE
-    style.paragraph_format.space_after = Pt(4)
+    _apply_report_font(style)
+    style.paragraph_format.space_after = _PT4
+    _apply_report_font(document.styles['Heading 2'])
 
     # Main Title
     title_p = document.add_paragraph()
     title_run = title_p.add_run("รายงานผลการตรวจสอบฉลากอาหาร")
     title_run.font.bold = True 
     title_p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    title_p.paragraph_format.space_after = Pt(12)
+    title_p.paragraph_format.space_after = _PT12
 
     # Add disclaimer box
     disclaimer_p = document.add_paragraph()
@@ -624,7 +877,7 @@ def generate_label_word_report(report_data):
     disclaimer_run = disclaimer_p.add_run("⚠️ คำเตือน: แอปพลิเคชันนี้เป็นตัวช่วยในการคำนวณและตรวจสอบฉลากอาหารเท่านั้น \nไม่สามารถใช้เป็นเงื่อนไขการขออนุญาต หรืออ้างอิงทางกฎหมายได้ \nโปรดปฏิบัติตามกฎหมายอย่างเคร่งครัด")
     disclaimer_run.font.bold = True
     disclaimer_run.font.color.rgb = COLOR_WARNING
-    disclaimer_p.paragraph_format.space_after = Pt(18)
+    disclaimer_p.paragraph_format.space_after = _PT18
 
     # 1. ข้อมูลพื้นฐาน
     add_styled_heading(document, "ข้อมูลพื้นฐาน", level=2, section_number="1.")
@@ -650,10 +903,8 @@ def generate_label_word_report(report_data):
         )
         add_styled_paragraph(document, foreign_manufacturer_line)
 
-    document.add_paragraph()
-
     # 2. ส่วนประกอบและวัตถุเจือปนอาหาร
-    add_styled_heading(document, "ส่วนประกอบและวัตถุเจือปนอาหาร", level=2, section_number="2.")
+    add_styled_heading(document, "ส่วนประกอบและวัตถุเจือปนอาหาร", level=2, section_number="2.", space_before=_SECTION_SPACE_BEFORE)
     
     # ส่วนประกอบหลัก
     if report_data.get('main_ingredients'):
@@ -686,10 +937,8 @@ def generate_label_word_report(report_data):
         "อาจมีข้อมูลอื่นๆเพิ่มเติม เช่น ข้อแนะนำในการเก็บรักษา วิธีปรุงเพื่อรับประทาน คำเตือนอื่นๆ นอกเหนือจากที่กฎหมายกำหนด",
         italic=True,
     )
-    document.add_paragraph()
-
     # 3. สารก่อภูมิแพ้
-    add_styled_heading(document, "สารก่อภูมิแพ้", level=2, section_number="3.")
+    add_styled_heading(document, "สารก่อภูมิแพ้", level=2, section_number="3.", space_before=_SECTION_SPACE_BEFORE)
     
     has_allergen_flag = report_data.get('has_allergen')
     allergen_groups_report = report_data.get('allergen_groups', [])
@@ -715,10 +964,8 @@ def generate_label_word_report(report_data):
     if not ((has_allergen_flag and allergen_groups_report) or (maybe_allergen_flag and maybe_allergen_groups_report)):
         add_styled_paragraph(document, "ไม่มีสารก่อภูมิแพ้", color=COLOR_SUCCESS)
     
-    document.add_paragraph()
-
     # 4. การกล่าวอ้างโภชนาการ
-    add_styled_heading(document, "การกล่าวอ้างโภชนาการ", level=2, section_number="4.")
+    add_styled_heading(document, "การกล่าวอ้างโภชนาการ", level=2, section_number="4.", space_before=_SECTION_SPACE_BEFORE)
     
     if report_data.get('has_nutrition_claim'):
         add_styled_paragraph(document, "มีการกล่าวอ้างโภชนาการ", color=COLOR_WARNING)
@@ -726,22 +973,19 @@ def generate_label_word_report(report_data):
     else:
         add_styled_paragraph(document, "ไม่มีการกล่าวอ้างโภชนาการ", color=COLOR_SUCCESS)
     
-    document.add_paragraph()
-
     # 5. ข้อมูลที่ต้องมีในฉลาก
-    add_styled_heading(document, "ข้อมูลที่ต้องมีในฉลาก", level=2, section_number="5.")
+    add_styled_heading(document, "ข้อมูลที่ต้องมีในฉลาก", level=2, section_number="5.", space_before=_SECTION_SPACE_BEFORE)
     
     required_labels = report_data.get('required_labels', [])
     if required_labels:
-        for i, label in enumerate(required_labels, 1):
-            add_styled_paragraph(document, f"{i}. {label}")
+        _append_paragraph_runs(
+            document, [f"{i}. {label}" for i, label in enumerate(required_labels, 1)]
+        )
     else:
         add_styled_paragraph(document, "ไม่พบข้อมูลที่ต้องแสดงในฉลาก", italic=True)
     
-    document.add_paragraph()
-
     # 6. ตัวอย่างฉลาก
-    add_styled_heading(document, "ตัวอย่างฉลาก", level=2, section_number="6.")
+    add_styled_heading(document, "ตัวอย่างฉลาก", level=2, section_number="6.", space_before=_SECTION_SPACE_BEFORE)
 
     label_preview = build_label_preview_context(
         report_data.get('food_name'),
@@ -782,8 +1026,8 @@ def generate_label_word_report(report_data):
         label_preview["core_lines"] + label_preview["extra_lines"]
     )
     for line in all_preview_lines:
-        display_text = line.get("display_value", line["value"])
-        if line.get("box"):
+        display_text = line["display_value"]
+        if line["box"]:
             text_cell.add_paragraph()
             inner_table = text_cell.add_table(rows=1, cols=1)
             inner_table.alignment = WD_TABLE_ALIGNMENT.CENTER
@@ -795,11 +1039,11 @@ def generate_label_word_report(report_data):
             inner_run = inner_paragraph.add_run(display_text)
             inner_run.bold = True
             set_cell_margins(inner_cell, top=30, start=120, bottom=30, end=120)
-            variant = line.get("badge_variant")
+            variant = line["badge_variant"]
             if variant == "warning":
                 inner_run.font.color.rgb = COLOR_ALERT_RED
                 set_cell_border(inner_cell, color="B91C1C")
-            inner_paragraph.paragraph_format.space_after = Pt(4)
+            inner_paragraph.paragraph_format.space_after = _PT4
             continue
 
         paragraph = text_cell.add_paragraph()
@@ -812,11 +1056,11 @@ def generate_label_word_report(report_data):
         if line["is_placeholder"]:
             value_run.font.italic = True
             value_run.font.color.rgb = COLOR_WARNING
-        paragraph.paragraph_format.space_after = Pt(2)
+        paragraph.paragraph_format.space_after = _PT2
 
     image_cell.paragraphs[0].text = ""
-    include_gda_image = any("ฉลาก GDA" in str(label) for label in required_labels)
-    include_nutrition_image = any("ตารางโภชนาการ" in str(label) for label in required_labels)
+    include_gda_image = any("ฉลาก GDA" in label for label in required_labels)
+    include_nutrition_image = any("ตารางโภชนาการ" in label for label in required_labels)
     image_entries = prepare_preview_image_entries(
         report_data.get('food_registration_number'),
         include_gda=include_gda_image,
@@ -836,19 +1080,13 @@ def generate_label_word_report(report_data):
             paragraph = image_cell.add_paragraph()
         paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
         run = paragraph.add_run()
-        if isinstance(image_obj, Image.Image):
-            buffer = io.BytesIO()
-            image_obj.save(buffer, format="PNG")
-            buffer.seek(0)
-            run.add_picture(buffer, width=width)
-        else:
-            run.add_picture(str(image_obj), width=width)
+        run.add_picture(io.BytesIO(_image_file_bytes(image_obj)), width=width)
         caption_para = image_cell.add_paragraph()
         caption_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
         caption_run = caption_para.add_run(caption)
         caption_run.italic = True
-        caption_run.font.size = Pt(10)
-        caption_para.paragraph_format.space_after = Pt(4)
+        caption_run.font.size = _PT10
+        caption_para.paragraph_format.space_after = _PT4
     if not images_added:
         placeholder_para = image_cell.paragraphs[0]
         placeholder_run = placeholder_para.add_run("ยังไม่พบไฟล์ภาพในโฟลเดอร์ assets/")
@@ -856,10 +1094,8 @@ def generate_label_word_report(report_data):
         placeholder_run.italic = True
         placeholder_run.font.color.rgb = COLOR_WARNING
 
-    document.add_paragraph()
-
     # 7. สรุป
-    add_styled_heading(document, "สรุป", level=2, section_number="7.")
+    add_styled_heading(document, "สรุป", level=2, section_number="7.", space_before=_SECTION_SPACE_BEFORE)
     add_styled_paragraph(document, f"พบข้อมูลที่ต้องแสดงในฉลากทั้งหมด {len(required_labels)} รายการ", color=COLOR_SUCCESS)
     add_styled_paragraph(document, f"วันที่ตรวจสอบ: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}")
     add_styled_paragraph(
@@ -871,27 +1107,40 @@ def generate_label_word_report(report_data):
 
     add_page_numbers(document)
 
-    # Global Font Override
-    for paragraph in document.paragraphs:
-        for run in paragraph.runs:
-            run.font.name = TARGET_FONT_NAME
-            run.font.size = TARGET_FONT_SIZE
-    
-    for table in document.tables:
-        for row in table.rows:
-            for cell in row.cells:
-                for paragraph in cell.paragraphs:
-                    for run in paragraph.runs:
-                        run.font.name = TARGET_FONT_NAME
-                        run.font.size = TARGET_FONT_SIZE
-
     file_stream = io.BytesIO()
     document.save(file_stream)
     file_stream.seek(0)
     return file_stream
 
+def generate_label_word_report_bytes(report_data):
+    """สร้างรายงาน Word เป็น bytes ใหม่ทุกครั้ง เพื่อให้วันที่ตรวจสอบในรายงานเป็นเวลาปัจจุบัน"""
+    return generate_label_word_report(report_data).getvalue()
+
+def _label_report_download_data(report_data):
+    # ถูกเรียกใน media handler ของ Streamlit ตอนกดดาวน์โหลด ซึ่งแสดง st.error ให้ผู้ใช้ไม่ได้ จึงบันทึกข้อผิดพลาดลง log
+    try:
+        return generate_label_word_report_bytes(report_data)
+    except Exception:
+        logger.exception("เกิดข้อผิดพลาดในการสร้างรายงาน Word")
+        raise
+
 def normalize_ins(s):
-    return re.sub(r"\s+", "", str(s)).lower()
+    return str(s).translate(_WS_TABLE).lower()
+
+_LABEL_FORMAT_KEYS = ("ins_number", "name_th", "name_en", "function_group")
+# แทนที่ทุกคีย์ในรอบเดียว ค่าที่แทนแล้วจะไม่ถูกสแกนซ้ำ
+_LABEL_FORMAT_RE = re.compile(r"\b(" + "|".join(map(re.escape, _LABEL_FORMAT_KEYS)) + r")\b")
+
+
+@functools.lru_cache(maxsize=512)
+def _ins_paren_re(ins_value):
+    """คืน regex (มี INS ในวงเล็บแล้ว, เลขในวงเล็บเปล่า) ของหมายเลข INS นั้น"""
+    escaped = re.escape(ins_value)
+    return (
+        re.compile(r"\(\s*ins\s*" + escaped + r"\s*\)", re.IGNORECASE),
+        re.compile(r"\(\s*" + escaped + r"\s*\)"),
+    )
+
 
 def format_label_required(template, row_data):
     """Replace placeholder tokens in label format with the INS data."""
@@ -905,32 +1154,87 @@ def format_label_required(template, row_data):
         if pd.isna(value):
             return ""
         return str(value).strip()
-    replacements = {
-        "ins_number": _sanitize(row_data.get("ins_number", "")),
-        "name_th": _sanitize(row_data.get("name_th", "")),
-        "name_en": _sanitize(row_data.get("name_en", "")),
-        "function_group": _sanitize(row_data.get("function_group", "")),
-    }
-    pattern = re.compile(r"\b(" + "|".join(re.escape(key) for key in replacements.keys()) + r")\b")
-
-    def _replace(match):
-        key = match.group(1)
-        value = replacements.get(key, "")
-        return value if value else match.group(0)
-
-    formatted = pattern.sub(_replace, template).strip()
+    replacements = {key: _sanitize(row_data.get(key, "")) for key in _LABEL_FORMAT_KEYS}
+    formatted = _LABEL_FORMAT_RE.sub(
+        lambda match: replacements[match.group(1)] or match.group(0), template
+    ).strip()
 
     # ใส่คำว่า INS หน้าหมายเลขในวงเล็บ หากยังไม่มี
     ins_value = replacements.get("ins_number")
-    if ins_value and not re.search(r"\(\s*ins\s*" + re.escape(ins_value) + r"\s*\)", formatted, re.IGNORECASE):
-        formatted = re.sub(
-            r"\(\s*" + re.escape(ins_value) + r"\s*\)",
-            f"(INS {ins_value})",
-            formatted
-        )
+    if ins_value:
+        ins_label = f"(INS {ins_value})"
+        # กรณีที่พบบ่อย: มี "(INS xxx)" อยู่แล้ว ไม่ต้องใช้ regex
+        if ins_label not in formatted:
+            has_ins_re, bare_paren_re = _ins_paren_re(ins_value)
+            if not has_ins_re.search(formatted):
+                formatted = bare_paren_re.sub(ins_label, formatted)
 
     return formatted
 
+# ตัวเลือกในฟอร์ม show() สร้างครั้งเดียวตอน import แทนการสร้างใหม่ทุกครั้งที่ Streamlit rerun
+FOOD_TYPE_OPTIONS = (
+    "อื่นๆ (ที่ไม่ใช่อาหารควบคุมเฉพาะ)",
+    "อาหารขบเคี้ยว ตัวอย่างเช่น มันฝรั่งทอดกรอบ ข้าวโพดอบกรอบ ข้าวเกรียบชนิดต่างๆ ถั่วลิสงส์อบปรุงรส สาหร่ายทอดอบกรอบ ปลาหมึกแผ่นอบกรอบ หมูแผ่นอบกรอบ",
+    "ช็อกโกแลต และขนมหวานรสช็อกโกแลต",
+    "ผลิตภัณฑ์ขนมอบ ตัวอย่างเช่น ขนมปังกรอบ ขนมขาไก่ เวเฟอร์สอดไส้ คุกกี้ เค้ก ขนมไหว้พระจันทร์ เอแคลร์ ครัวซองท์ พายไส้ต่างๆ",
+    "อาหารกึ่งสำเร็จรูป",
+    "อาหารมื้อหลักที่เป็นอาหารจานเดียว ซึ่งต้องเก็บรักษาไว้ในตู้เย็นหรือตู้แช่แข็งตลอดระยะเวลาจำหน่าย",
+    "เครื่องดื่มในภาชนะบรรจุที่ปิดสนิท",
+    "ชาปรุงสำเร็จ ทั้งชนิดเหลวและชนิดแห้ง",
+    "กาแฟปรุงสำเร็จ ทั้งชนิดเหลวและชนิดแห้ง",
+    "นมปรุงแต่ง",
+    "นมเปรี้ยว",
+    "ผลิตภัณฑ์ของนม",
+    "น้ำนมถั่วเหลือง",
+    "ไอศกรีมที่อยู่ในลักษณะพร้อมบริโภค",
+    "วุ้นสำเร็จรูป",
+    "ผลิตภัณฑ์เสริมอาหาร",
+    "ชาจากพืช",
+)
+CONSISTENCY_OPTIONS = ("ของเหลว", "ของแข็ง")
+SUPPLEMENT_CONSISTENCY_OPTIONS = ("ของเหลว", "ของแข็ง", "เม็ดหรือแคปซูล")
+FLAVORING_OPTIONS = (
+    ("flavor_aroma_natural", "แต่งกลิ่นธรรมชาติ"),
+    ("flavor_aroma_nature_identical", "แต่งกลิ่นเลียนธรรมชาติ"),
+    ("flavor_aroma_artificial", "แต่งกลิ่นสังเคราะห์"),
+    ("flavor_taste_natural", "แต่งรสธรรมชาติ"),
+    ("flavor_taste_nature_identical", "แต่งรสเลียนธรรมชาติ"),
+)
+CAFFEINE_OPTIONS = ("ไม่มีกาเฟอีน", "ใช้วัตถุแต่งกลิ่นรสที่มีกาเฟอีนตามธรรมชาติ", "ผสมกาเฟอีนรูปแบบอื่น")
+
+# หมายเหตุที่แสดงใต้ตัวเลือกประเภทอาหารในฟอร์ม (ประเภทอาหาร -> ข้อความ)
+FOOD_TYPE_FORM_NOTES = {
+    "วุ้นสำเร็จรูป": (
+        "⚠️ **หมายเหตุ**: ต้องแสดง 'เด็กควรบริโภคแต่น้อย' ด้วยตัวอักษรสีแดงขนาด 5 มิลลิเมตร ในกรอบพื้นสีขาว",
+    ),
+    "ชาจากพืช": (
+        "⚠️ **หมายเหตุ**: กรุณาศึกษารายชื่อพืชที่อนุญาต และคำเตือนเพิ่มเติม ในประกาศกระทรวงสาธารณสุข ฉบับที่ 426",
+    ),
+    "ผลิตภัณฑ์เสริมอาหาร": (
+        "⚠️ **หมายเหตุ**: ต้องแสดงคำเตือนดังต่อไปนี้:",
+        "• 'คำเตือน' ด้วยตัวอักษรขนาดไม่เล็กกว่า 1.5 มม. ในกรอบสี่เหลี่ยมสีของตัวอักษรตัดกับสีของพื้นกรอบ และสีกรอบตัดกับสีของพื้นฉลาก",
+        "• 'เด็กและสตรีมีครรภ์ ไม่ควรรับประทาน' ด้วยตัวอักษรที่มีขนาดเห็นได้ชัดเจน",
+        "• 'ควรกินอาหารหลากหลาย ครบ 5 หมู่ ในสัดส่วนที่เหมาะสมเป็นประจำ' ด้วยตัวอักษรที่มีขนาดเห็นได้ชัดเจน",
+        "• 'ไม่มีผลในการป้องกัน หรือรักษาโรค' ด้วยตัวอักษรหนาทึบ ในกรอบสี่เหลี่ยม สีของตัวอักษรตัดกับสีของพื้นกรอบ และสีของกรอบตัดกับสีของพื้นฉลาก",
+    ),
+}
+
+# กลุ่มสารก่อภูมิแพ้ตามกฎหมาย แสดงให้อ่านก่อนกรอกข้อมูล
+_ALLERGEN_INFO_MD = """
+        ประเภทหรือชนิดของอาหารซึ่งมีสารก่อภูมิแพ้ หรือสารที่ก่อภาวะภูมิไวเกิน:
+        
+        - ธัญพืชที่มีกลูเตน ได้แก่ ข้าวสาลี ข้าวไรย์ ข้าวบาร์เลย์ ข้าวโอ๊ต สเปลท์ หรือสายพันธุ์ลูกผสมของธัญพืชดังกล่าว และผลิตภัณฑ์จากธัญพืชที่มีกลูเตนดังกล่าว ยกเว้น (ก) กลูโคสไซรัป หรือเดกซ์โทรสที่ได้จากข้าวสาลี (ข) มอลโทเดกซ์ตริน จากข้าวสาลี (ค) กลูโคสไซรัป จากข้าวบาร์เลย์ (ง) แอลกฮอล์ที่ได้จากการกลั่นเมล็ดธัญพืช
+        - สัตว์น้ำที่มีเปลือกแข็ง เช่น ปู กุ้ง กั้ง ลอบสเตอร์ เป็นต้น และผลิตภัณฑ์จากสัตว์น้ำที่มีเปลือกแข็ง
+        - ไข่ และผลิตภัณฑ์จากไข่
+        - ปลา และผลิตภัณฑ์จากปลา ยกเว้น เจลาตินจากปลาที่ใช้เป็นสารช่วยพาวิตามินและแคโรทีนอยด์
+        - ถั่วลิสง และผลิตภัณฑ์จากถั่วลิสง
+        - ถั่วเหลือง และผลิตภัณฑ์จากถั่วเหลือง ยกเว้น (ก) น้ำมันหรือไขมันจากถั่วเหลืองที่ผ่านกระบวนการทำให้บริสุทธิ์ (ข) โทโคเฟอรอลผสม, ดี-แอลฟา-โทโคเฟอรอล, หรือ ดีแอล-แอลฟา-โทโคเฟอรอล หรือ ดี-แอลฟา-โทโคเฟอริลแอซีเทต, หรือ ดีแอล-แอลฟา-โทโคเฟอริลแอซีเทต หรือ ดี-แอลฟา-โทโคเฟอริลแอซิดซักซิเนต ที่ได้จากถั่วเหลือง (ค) ไฟโตสเตอรอล และไฟโตสเตอรอลเอสเตอร์ที่ได้จากน้ำมันถั่วเหลือง (ง) สตานอลเอสเตอร์จากพืชที่ผลิตจากสเตอรอลของน้ำมันพืชที่ได้จากถั่วเหลือง
+        - นม และผลิตภัณฑ์จากนม รวมถึงแลคโตส ยกเว้น แลคติทอล
+        - ถั่วที่มีเปลือกแข็ง และผลิตภัณฑ์จากถั่วที่มีเปลือกแข็ง เช่น อัลมอนต์ วอลนัท พีแคน เป็นต้น
+        - ซัลไฟต์ ที่มีปริมาณมากกว่าหรือเท่ากับ 10 มิลลิกรัมต่อกิโลกรัม
+        - หอย หมึก และผลิตภัณฑ์จากหอย หมึก
+        """
+
 def show():
     st.title("🔍 ตรวจสอบฉลากอาหาร")
     st.markdown("กรุณากรอกข้อมูลเพื่อตรวจสอบข้อความและคำเตือนที่ต้องแสดงในฉลากอาหาร")
@@ -963,53 +1267,22 @@ def show():
     
     # 2. ประเภทอาหาร/ชนิดอาหาร
     st.subheader("2. ประเภทอาหาร/ชนิดอาหาร")
-    food_type = st.selectbox(
-        "เลือกประเภทอาหาร",
-        [
-            "อื่นๆ (ที่ไม่ใช่อาหารควบคุมเฉพาะ)",
-            "อาหารขบเคี้ยว ตัวอย่างเช่น มันฝรั่งทอดกรอบ ข้าวโพดอบกรอบ ข้าวเกรียบชนิดต่างๆ ถั่วลิสงส์อบปรุงรส สาหร่ายทอดอบกรอบ ปลาหมึกแผ่นอบกรอบ หมูแผ่นอบกรอบ",
-            "ช็อกโกแลต และขนมหวานรสช็อกโกแลต", 
-            "ผลิตภัณฑ์ขนมอบ ตัวอย่างเช่น ขนมปังกรอบ ขนมขาไก่ เวเฟอร์สอดไส้ คุกกี้ เค้ก ขนมไหว้พระจันทร์ เอแคลร์ ครัวซองท์ พายไส้ต่างๆ",
-            "อาหารกึ่งสำเร็จรูป",
-            "อาหารมื้อหลักที่เป็นอาหารจานเดียว ซึ่งต้องเก็บรักษาไว้ในตู้เย็นหรือตู้แช่แข็งตลอดระยะเวลาจำหน่าย",
-            "เครื่องดื่มในภาชนะบรรจุที่ปิดสนิท",
-            "ชาปรุงสำเร็จ ทั้งชนิดเหลวและชนิดแห้ง",
-            "กาแฟปรุงสำเร็จ ทั้งชนิดเหลวและชนิดแห้ง",
-            "นมปรุงแต่ง",
-            "นมเปรี้ยว",
-            "ผลิตภัณฑ์ของนม",
-            "น้ำนมถั่วเหลือง",
-            "ไอศกรีมที่อยู่ในลักษณะพร้อมบริโภค",
-            "วุ้นสำเร็จรูป",
-            "ผลิตภัณฑ์เสริมอาหาร",
-            "ชาจากพืช"
-        ]
-    )
+    food_type = st.selectbox("เลือกประเภทอาหาร", FOOD_TYPE_OPTIONS)
     
-    if food_type != "อื่นๆ (ที่ไม่ใช่อาหารควบคุมเฉพาะ)" and food_type != "วุ้นสำเร็จรูป" and food_type != "ผลิตภัณฑ์เสริมอาหาร" and food_type != "ชาจากพืช":
+    if food_type not in NON_GDA_TYPES:
         st.info("📋 **หมายเหตุ**: อาหารประเภทนี้ต้องมีฉลาก GDA และตารางโภชนาการ")
     
-    if food_type == "วุ้นสำเร็จรูป":
-        st.warning("⚠️ **หมายเหตุ**: ต้องแสดง 'เด็กควรบริโภคแต่น้อย' ด้วยตัวอักษรสีแดงขนาด 5 มิลลิเมตร ในกรอบพื้นสีขาว")
-    
-    if food_type == "ชาจากพืช":
-        st.warning("⚠️ **หมายเหตุ**: กรุณาศึกษารายชื่อพืชที่อนุญาต และคำเตือนเพิ่มเติม ในประกาศกระทรวงสาธารณสุข ฉบับที่ 426")
-    
-    if food_type == "ผลิตภัณฑ์เสริมอาหาร":
-        st.warning("⚠️ **หมายเหตุ**: ต้องแสดงคำเตือนดังต่อไปนี้:")
-        st.warning("• 'คำเตือน' ด้วยตัวอักษรขนาดไม่เล็กกว่า 1.5 มม. ในกรอบสี่เหลี่ยมสีของตัวอักษรตัดกับสีของพื้นกรอบ และสีกรอบตัดกับสีของพื้นฉลาก")
-        st.warning("• 'เด็กและสตรีมีครรภ์ ไม่ควรรับประทาน' ด้วยตัวอักษรที่มีขนาดเห็นได้ชัดเจน")
-        st.warning("• 'ควรกินอาหารหลากหลาย ครบ 5 หมู่ ในสัดส่วนที่เหมาะสมเป็นประจำ' ด้วยตัวอักษรที่มีขนาดเห็นได้ชัดเจน")
-        st.warning("• 'ไม่มีผลในการป้องกัน หรือรักษาโรค' ด้วยตัวอักษรหนาทึบ ในกรอบสี่เหลี่ยม สีของตัวอักษรตัดกับสีของพื้นกรอบ และสีของกรอบตัดกับสีของพื้นฉลาก")
+    for note in FOOD_TYPE_FORM_NOTES.get(food_type, ()):
+        st.warning(note)
     
     # 3. ลักษณะของอาหาร
     st.subheader("3. ลักษณะของอาหาร")
     
     # กำหนดตัวเลือกลักษณะอาหารตามประเภทอาหาร
     if food_type == "ผลิตภัณฑ์เสริมอาหาร":
-        consistency_options = ["ของเหลว", "ของแข็ง", "เม็ดหรือแคปซูล"]
+        consistency_options = SUPPLEMENT_CONSISTENCY_OPTIONS
     else:
-        consistency_options = ["ของเหลว", "ของแข็ง"]
+        consistency_options = CONSISTENCY_OPTIONS
     
     food_consistency = st.radio(
         "เลือกลักษณะของอาหาร",
@@ -1035,13 +1308,9 @@ def show():
     
     # Main ingredients with inline suggestions from warnings_database
     try:
-        _warnings_db = load_warnings_database()
-        _warning_keywords = (
-            _warnings_db["keyword"].dropna().astype(str).str.strip().tolist()
-            if "keyword" in _warnings_db.columns else []
-        )
+        _warning_keywords, _warning_keywords_lower = _warning_keyword_index()
     except Exception:
-        _warning_keywords = []
+        _warning_keywords, _warning_keywords_lower = [], []
 
     main_ingredients = []
     for i in range(st.session_state.main_ingredient_count):
@@ -1050,7 +1319,11 @@ def show():
         # Show suggestions when user types >= 2 chars; keep free text otherwise
         q = (main_ing or "").strip()
         if q and len(q) >= 2 and _warning_keywords:
-            suggs = [kw for kw in _warning_keywords if q.lower() in kw.lower()][:8]
+            ql = q.lower()
+            suggs = list(islice(
+                (kw for kw, kw_lower in zip(_warning_keywords, _warning_keywords_lower) if ql in kw_lower),
+                8,
+            ))
             if suggs:
                 st.caption("ท่านหมายถึงส่วนประกอบเหล่านี้หรือไม่ หากใช่กรุณาคลิก")
                 cols = st.columns(min(len(suggs), 4))
@@ -1066,15 +1339,8 @@ def show():
     st.write("")
     
     st.markdown("**การแต่งกลิ่นและรส**")
-    flavoring_options = [
-        ("flavor_aroma_natural", "แต่งกลิ่นธรรมชาติ"),
-        ("flavor_aroma_nature_identical", "แต่งกลิ่นเลียนธรรมชาติ"),
-        ("flavor_aroma_artificial", "แต่งกลิ่นสังเคราะห์"),
-        ("flavor_taste_natural", "แต่งรสธรรมชาติ"),
-        ("flavor_taste_nature_identical", "แต่งรสเลียนธรรมชาติ"),
-    ]
     flavoring_statements = []
-    for key, label in flavoring_options:
+    for key, label in FLAVORING_OPTIONS:
         if st.checkbox(label, key=key):
             flavoring_statements.append(label)
     
@@ -1090,7 +1356,7 @@ def show():
         
         caffeine_option = st.radio(
             "เลือกประเภทกาเฟอีน",
-            ["ไม่มีกาเฟอีน", "ใช้วัตถุแต่งกลิ่นรสที่มีกาเฟอีนตามธรรมชาติ", "ผสมกาเฟอีนรูปแบบอื่น"],
+            CAFFEINE_OPTIONS,
             key="caffeine_option"
         )
         
@@ -1122,22 +1388,7 @@ def show():
     st.subheader("5. สารก่อภูมิแพ้")
 
     # แสดงกลุ่มสารก่อภูมิแพ้ตามกฎหมายเพื่อให้อ่านก่อน
-    st.markdown(
-        """
-        ประเภทหรือชนิดของอาหารซึ่งมีสารก่อภูมิแพ้ หรือสารที่ก่อภาวะภูมิไวเกิน:
-        
-        - ธัญพืชที่มีกลูเตน ได้แก่ ข้าวสาลี ข้าวไรย์ ข้าวบาร์เลย์ ข้าวโอ๊ต สเปลท์ หรือสายพันธุ์ลูกผสมของธัญพืชดังกล่าว และผลิตภัณฑ์จากธัญพืชที่มีกลูเตนดังกล่าว ยกเว้น (ก) กลูโคสไซรัป หรือเดกซ์โทรสที่ได้จากข้าวสาลี (ข) มอลโทเดกซ์ตริน จากข้าวสาลี (ค) กลูโคสไซรัป จากข้าวบาร์เลย์ (ง) แอลกฮอล์ที่ได้จากการกลั่นเมล็ดธัญพืช
-        - สัตว์น้ำที่มีเปลือกแข็ง เช่น ปู กุ้ง กั้ง ลอบสเตอร์ เป็นต้น และผลิตภัณฑ์จากสัตว์น้ำที่มีเปลือกแข็ง
-        - ไข่ และผลิตภัณฑ์จากไข่
-        - ปลา และผลิตภัณฑ์จากปลา ยกเว้น เจลาตินจากปลาที่ใช้เป็นสารช่วยพาวิตามินและแคโรทีนอยด์
-        - ถั่วลิสง และผลิตภัณฑ์จากถั่วลิสง
-        - ถั่วเหลือง และผลิตภัณฑ์จากถั่วเหลือง ยกเว้น (ก) น้ำมันหรือไขมันจากถั่วเหลืองที่ผ่านกระบวนการทำให้บริสุทธิ์ (ข) โทโคเฟอรอลผสม, ดี-แอลฟา-โทโคเฟอรอล, หรือ ดีแอล-แอลฟา-โทโคเฟอรอล หรือ ดี-แอลฟา-โทโคเฟอริลแอซีเทต, หรือ ดีแอล-แอลฟา-โทโคเฟอริลแอซีเทต หรือ ดี-แอลฟา-โทโคเฟอริลแอซิดซักซิเนต ที่ได้จากถั่วเหลือง (ค) ไฟโตสเตอรอล และไฟโตสเตอรอลเอสเตอร์ที่ได้จากน้ำมันถั่วเหลือง (ง) สตานอลเอสเตอร์จากพืชที่ผลิตจากสเตอรอลของน้ำมันพืชที่ได้จากถั่วเหลือง
-        - นม และผลิตภัณฑ์จากนม รวมถึงแลคโตส ยกเว้น แลคติทอล
-        - ถั่วที่มีเปลือกแข็ง และผลิตภัณฑ์จากถั่วที่มีเปลือกแข็ง เช่น อัลมอนต์ วอลนัท พีแคน เป็นต้น
-        - ซัลไฟต์ ที่มีปริมาณมากกว่าหรือเท่ากับ 10 มิลลิกรัมต่อกิโลกรัม
-        - หอย หมึก และผลิตภัณฑ์จากหอย หมึก
-        """
-    )
+    st.markdown(_ALLERGEN_INFO_MD)
 
     # ฟอร์มให้ติ๊ก และกรอกเองเมื่อมี/อาจมี
     has_allergen = st.checkbox("มีสารก่อภูมิแพ้ในส่วนประกอบ")
@@ -1235,6 +1486,162 @@ def show():
             foreign_manufacturer_country=foreign_manufacturer_country
         )
 
+# ข้อความฉลากที่ใช้ซ้ำหลายจุด
+LABEL_NUTRITION_TABLE = "ต้องแสดงตารางโภชนาการ"
+LABEL_GDA = "ต้องแสดงฉลาก GDA ตามประกาศฯ 394"
+LABEL_CAFFEINE_AMOUNT = "แสดง 'มีกาเฟอีน ....... มก./ 100 มล.' ในกรอบสี่เหลี่ยมพื้นขาว ความสูงไม่น้อยกว่า 2 มม. ที่อ่านได้ชัดเจน บริเวณเดียวกับชื่ออาหารหรือเครื่องหมายการค้า"
+# แม่แบบข้อความฉลากที่เติมค่าด้วย str.format_map
+ALLERGEN_LABEL_TPL = "แสดง ข้อมูลสำหรับผู้แพ้อาหาร: มี{allergens} หรือแสดง 'มี {allergens}' ในกรอบสี่เหลี่ยม"
+MAYBE_ALLERGEN_LABEL_TPL = "แสดง ข้อมูลสำหรับผู้แพ้อาหาร: อาจมี{allergens} หรือแสดง 'อาจมี {allergens}' ในกรอบสี่เหลี่ยม"
+WARN_GDA = "⚠️ **ประเภทอาหารที่ต้องแสดงฉลาก GDA**: ต้องแสดงฉลาก GDA และตารางโภชนาการตามประกาศฯ 394"
+WARN_FURTHER_STUDY = "กรุณาศึกษาประกาศกระทรวงสาธารณสุขที่เกี่ยวข้องกับประเภทอาหารของท่านเพิ่มเติม เนื่องจากอาจมีข้อความที่กำหนดให้แสดงนอกเหนือจากนี้ ได้ที่[เว็ปไซต์กองอาหาร](https://food.fda.moph.go.th/food-law/category/food-product/)"
+
+_HERBAL_TEA_WARNING = "กรุณาศึกษารายชื่อพืชที่อนุญาต และคำเตือนเพิ่มเติม ในประกาศกระทรวงสาธารณสุข ฉบับที่ 426 เนื่องจากแอปนี้ไม่สามารถตรวจสอบได้"
+_SNACK_RULE = (
+    ("⚠️ **อาหารขบเคี้ยว/ช็อกโกแลต/ขนมอบ**: ต้องแสดงข้อความในกรอบสี่เหลี่ยมว่า 'บริโภคแต่น้อยและออกกำลังกายเพื่อสุขภาพ'",),
+    ("ข้อความ 'บริโภคแต่น้อยและออกกำลังกายเพื่อสุขภาพ' ด้วยตัวอักษรหนาทึบ เห็นได้ชัดเจน สีของตัวอักษรตัดกับสีพื้นของกรอบ และสีของกรอบตัดกับสีพื้นฉลาก",),
+)
+
+# คำเตือนเฉพาะตามประเภทอาหาร: ประเภทอาหาร -> (ข้อความแจ้งเตือนบนหน้าจอ, ข้อความที่ต้องแสดงบนฉลาก)
+FOOD_TYPE_LABEL_RULES = {
+    "วุ้นสำเร็จรูป": (
+        ("⚠️ **วุ้นสำเร็จรูป**: ต้องแสดง 'เด็กควรบริโภคแต่น้อย' ด้วยตัวอักษรสีแดงขนาด 5 มิลลิเมตร ในกรอบพื้นสีขาว",),
+        ("แสดง 'เด็กควรบริโภคแต่น้อย' ด้วยตัวอักษรสีแดงขนาด 5 มิลลิเมตร ในกรอบพื้นสีขาว",),
+    ),
+    "ชาจากพืช": (
+        (f"⚠️ **ชาจากพืช**: {_HERBAL_TEA_WARNING}",),
+        (_HERBAL_TEA_WARNING,),
+    ),
+    "ผลิตภัณฑ์เสริมอาหาร": (
+        (
+            "⚠️ **ผลิตภัณฑ์เสริมอาหาร**: ต้องแสดงคำเตือนดังต่อไปนี้:",
+            "• 'คำเตือน' ด้วยตัวอักษรขนาดไม่เล็กกว่า 1.5 มม. ในกรอบสี่เหลี่ยม",
+            "• 'เด็กและสตรีมีครรภ์ ไม่ควรรับประทาน' ด้วยตัวอักษรที่มีขนาดเห็นได้ชัดเจน",
+            "• 'ควรกินอาหารหลากหลาย ครบ 5 หมู่ ในสัดส่วนที่เหมาะสมเป็นประจำ' ด้วยตัวอักษรที่มีขนาดเห็นได้ชัดเจน",
+            "• 'ไม่มีผลในการป้องกัน หรือรักษาโรค' ด้วยตัวอักษรหนาทึบ ในกรอบสี่เหลี่ยม",
+        ),
+        (
+            "แสดง 'คำเตือน' ด้วยตัวอักษรขนาดไม่เล็กกว่า 1.5 มม. ในกรอบสี่เหลี่ยมสีของตัวอักษรตัดกับสีของพื้นกรอบ และสีกรอบตัดกับสีของพื้นฉลาก",
+            "แสดง 'เด็กและสตรีมีครรภ์ ไม่ควรรับประทาน' ด้วยตัวอักษรที่มีขนาดเห็นได้ชัดเจน",
+            "แสดง 'ควรกินอาหารหลากหลาย ครบ 5 หมู่ ในสัดส่วนที่เหมาะสมเป็นประจำ' ด้วยตัวอักษรที่มีขนาดเห็นได้ชัดเจน",
+            "แสดง 'ไม่มีผลในการป้องกัน หรือรักษาโรค' ด้วยตัวอักษรหนาทึบ ในกรอบสี่เหลี่ยม สีของตัวอักษรตัดกับสีของพื้นกรอบ และสีของกรอบตัดกับสีของพื้นฉลาก",
+        ),
+    ),
+    **dict.fromkeys(SNACK_CHOCO_BAKERY, _SNACK_RULE),
+}
+
+# เครื่องดื่มในภาชนะบรรจุที่ปิดสนิท: ตัวเลือกกาเฟอีน -> (ข้อความแจ้งเตือน, ข้อความบนฉลาก, ต้องระบุภาชนะหรือไม่)
+# ข้อความที่มี {container_type} จะถูกเติมด้วย format_map ตามภาชนะที่ผู้ใช้ระบุ
+CAFFEINE_LABEL_RULES = {
+    "ใช้วัตถุแต่งกลิ่นรสที่มีกาเฟอีนตามธรรมชาติ": (
+        "⚠️ **เครื่องดื่มกาเฟอีน**: ต้องมีคำเตือน 'มีกาเฟอีน' ด้วยตัวอักษรขนาดความสูงไม่น้อยกว่า 2 มิลลิเมตร",
+        "คำเตือน 'มีกาเฟอีน' ด้วยตัวอักษรขนาดความสูงไม่น้อยกว่า 2 มิลลิเมตร ที่อ่านได้ชัดเจน อยู่ในบริเวณเดียวกับชื่ออาหารหรือเครื่องหมายการค้า",
+        False,
+    ),
+    "ผสมกาเฟอีนรูปแบบอื่น": (
+        "⚠️ **เครื่องดื่มกาเฟอีน**: ต้องแสดงข้อความ 'ห้ามดื่มเกินวันละ 2 {container_type} เพราะอาจทำให้ใจสั่น นอนไม่หลับ เด็กและสตรีมีครรภ์ไม่ควรดื่ม ผู้มีโรคประจำตัวหรือผู้ป่วยปรึกษาแพทย์ก่อน'",
+        "ข้อความ 'ห้ามดื่มเกินวันละ 2 {container_type} เพราะอาจทำให้ใจสั่น นอนไม่หลับ เด็กและสตรีมีครรภ์ไม่ควรดื่ม ผู้มีโรคประจำตัวหรือผู้ป่วยปรึกษาแพทย์ก่อน' ด้วยตัวอักษรเส้นทึบสีแดง ขนาดความสูงไม่น้อยกว่า 2 มิลลิเมตร ในกรอบสี่เหลี่ยมพื้นขาว สีของกรอบตัดกับสีของพื้นฉลาก",
+        True,
+    ),
+}
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def compute_label_requirements(food_type, caffeine_option=None, container_type=None):
+    """คำเตือนเฉพาะตามประเภทอาหาร
+
+    คืน dict ที่มี ``warnings`` (ข้อความแจ้งเตือนบนหน้าจอ) และ ``required_labels``
+    (ข้อความที่ต้องแสดงบนฉลาก) ผลลัพธ์ถูก cache ตามประเภทอาหารและตัวเลือกกาเฟอีน
+    """
+    messages, labels = FOOD_TYPE_LABEL_RULES.get(food_type, ((), ()))
+    messages, labels = list(messages), list(labels)
+
+    if food_type == "เครื่องดื่มในภาชนะบรรจุที่ปิดสนิท":
+        caffeine_rule = CAFFEINE_LABEL_RULES.get(caffeine_option)
+        if caffeine_rule:
+            message, label, needs_container = caffeine_rule
+            if container_type or not needs_container:
+                fields = {"container_type": container_type}
+                messages.append(message.format_map(fields))
+                labels.append(label.format_map(fields))
+
+    return {"warnings": messages, "required_labels": labels}
+
+# CSS ของกล่องตัวอย่างฉลาก ต้องส่งทุกครั้งที่ rerun (Streamlit ลบ element ที่ไม่ถูกสร้างซ้ำ)
+LABEL_CSS = """
+        <style>
+        .label-preview-box {
+            border: 2px solid #374151;
+            border-radius: 12px;
+            padding: 18px 22px;
+            background-color: #ffffff;
+            box-shadow: 0 2px 6px rgba(0, 0, 0, 0.08);
+        }
+        .label-preview-title {
+            font-size: 1.25rem;
+            font-weight: 700;
+            text-align: center;
+            margin-bottom: 12px;
+        }
+        .label-preview-label {
+            font-weight: 600;
+        }
+        .label-preview-line {
+            margin-bottom: 6px;
+        }
+        .label-preview-line.placeholder,
+        .label-preview-title.placeholder {
+            color: #d97706;
+            font-style: italic;
+        }
+        .label-preview-badge {
+            border: 2px solid #111827;
+            border-radius: 6px;
+            padding: 6px 12px;
+            text-align: center;
+            margin: 8px 0;
+            font-weight: 600;
+            display: inline-block;
+        }
+        .label-preview-badge.placeholder {
+            color: #d97706;
+            font-style: italic;
+        }
+        .label-preview-badge.warning {
+            border-color: #dc2626;
+            color: #dc2626;
+            background-color: #ffffff;
+        }
+        </style>
+        """
+
+@functools.lru_cache(maxsize=256)
+def _ingredients_line(ingredients, food_type, single_ingredient_only):
+    """ข้อความ 'ส่วนประกอบที่สำคัญ' ที่ต้องแสดงบนฉลาก หรือ None หากไม่ต้องแสดง"""
+    if not ingredients or single_ingredient_only:
+        return None
+    ingredients_text = ", ".join(ingredients)
+    if food_type == "ผลิตภัณฑ์เสริมอาหาร":
+        return f"ส่วนประกอบที่สำคัญ: {ingredients_text} พร้อมแสดงปริมาณ โดยให้เรียงลำดับปริมาณจากมากไปน้อย"
+    return f"ส่วนประกอบที่สำคัญ: {ingredients_text} พร้อมแสดงร้อยละของน้ำหนักโดยประมาณ"
+
+def _format_preview_line(line):
+    """แปลงบรรทัดตัวอย่างฉลากหนึ่งบรรทัดเป็น HTML (ใช้ค่าที่ escape ไว้แล้วใน context)"""
+    if line["box"]:
+        badge_class = "label-preview-badge"
+        variant = line["badge_variant"]
+        if variant:
+            badge_class += f" {variant}"
+        if line["is_placeholder"]:
+            badge_class += " placeholder"
+        return f"<div class='{badge_class}'>{line['escaped_display']}</div>"
+    label_part = ""
+    if line["escaped_label"]:
+        label_part = f"<span class='label-preview-label'>{line['escaped_label']}:</span> "
+    line_class = "label-preview-line"
+    if line["is_placeholder"]:
+        line_class += " placeholder"
+    return f"<div class='{line_class}'>{label_part}{line['escaped_display']}</div>"
+
 def generate_label_report(food_name, food_type, food_consistency, main_ingredients, ins_list,
                           has_allergen, allergen_groups, has_nutrition_claim,
                           food_registration_number, manufacturer_name, manufacturer_role, manufacturer_address,
@@ -1280,46 +1687,40 @@ def generate_label_report(food_name, food_type, food_consistency, main_ingredien
     # ส่วนประกอบและวัตถุเจือปนอาหาร
     st.markdown("### 🧪 ส่วนประกอบและวัตถุเจือปนอาหาร")
     
-    required_labels = []
+    # dict ใช้แทนลิสต์ที่ไม่มีข้อความซ้ำและคงลำดับการเพิ่ม
+    required_labels = {}
+    # เครื่องหมายของข้อความสำคัญที่เพิ่มแล้ว ("gda", "nutrition_table") แทนการค้นหาข้อความซ้ำ
+    required_markers = set()
     ins_results = []
     ingredient_warnings = []
 
+    def add_label(text, *markers):
+        required_labels[text] = None
+        required_markers.update(markers)
+
     # แนะนำการแสดงปริมาณคาเฟอีนสำหรับชาปรุงสำเร็จ/กาแฟปรุงสำเร็จ
-    if food_type in [
-        "ชาปรุงสำเร็จ ทั้งชนิดเหลวและชนิดแห้ง",
-        "กาแฟปรุงสำเร็จ ทั้งชนิดเหลวและชนิดแห้ง",
-    ]:
-        required_labels.append(
-            "แสดง 'มีกาเฟอีน ....... มก./ 100 มล.' ในกรอบสี่เหลี่ยมพื้นขาว ความสูงไม่น้อยกว่า 2 มม. ที่อ่านได้ชัดเจน บริเวณเดียวกับชื่ออาหารหรือเครื่องหมายการค้า"
-        )
+    if food_type in CAFFEINE_TEA_COFFEE:
+        add_label(LABEL_CAFFEINE_AMOUNT)
 
     # ส่วนประกอบหลัก
+    ingredients_line = _ingredients_line(tuple(main_ingredients), food_type, single_ingredient_only)
     if main_ingredients:
         st.markdown("#### 📋 ส่วนประกอบหลัก")
-        ingredients_text = ", ".join(main_ingredients)
-        st.write(f"**ส่วนประกอบ**: {ingredients_text}")
+        st.write(f"**ส่วนประกอบ**: {', '.join(main_ingredients)}")
         # หากไม่ได้ยกเว้น ให้ระบุรายละเอียดการแสดงส่วนประกอบที่สำคัญตามประเภทอาหาร
-        if not single_ingredient_only:
-            if food_type == "ผลิตภัณฑ์เสริมอาหาร":
-                required_labels.append(
-                    f"ส่วนประกอบที่สำคัญ: {ingredients_text} พร้อมแสดงปริมาณ โดยให้เรียงลำดับปริมาณจากมากไปน้อย"
-                )
-            else:
-                required_labels.append(
-                    f"ส่วนประกอบที่สำคัญ: {ingredients_text} พร้อมแสดงร้อยละของน้ำหนักโดยประมาณ"
-                )
+        if ingredients_line:
+            add_label(ingredients_line)
         
         # คำเตือนจากส่วนประกอบหลัก
         st.markdown("#### ⚠️ คำเตือนจากส่วนประกอบหลัก")
-        warnings_db = load_warnings_database()
+        warnings_index = load_warnings_index()
         
         for ing in main_ingredients:
-            matched = warnings_db[warnings_db["keyword"].str.strip().str.lower() == ing.lower()]
-            if not matched.empty:
-                row = matched.iloc[0]
+            row = warnings_index.get(ing.lower())
+            if row is not None:
                 warning_message = f"คำเตือนสำหรับ '{ing}': {row['warning']}"
                 st.warning(f"⚠️ {warning_message}")
-                required_labels.append(f"คำเตือน: {row['warning']}")
+                add_label(f"คำเตือน: {row['warning']}")
                 ingredient_warnings.append(warning_message)
             else:
                 st.success(f"✅ '{ing}' ไม่พบคำเตือนเฉพาะ")
@@ -1328,22 +1729,16 @@ def generate_label_report(food_name, food_type, food_consistency, main_ingredien
         st.markdown("#### 🌸 การแต่งกลิ่น/รส")
         combined_flavoring_text = ", ".join(flavoring_statements)
         st.info(f"ต้องแสดงข้อความ: '{combined_flavoring_text}' บนฉลาก")
-        if combined_flavoring_text not in required_labels:
-            required_labels.append(combined_flavoring_text)
+        add_label(combined_flavoring_text)
     
     # วัตถุเจือปนอาหาร
     if ins_list:
         st.markdown("#### 🔍 ผลการตรวจสอบวัตถุเจือปนอาหาร (INS)")
-        ins_db = load_ins_database()
-        
-        ins_db["normalized"] = ins_db["ins_number"].astype(str).apply(normalize_ins)
+        ins_index = load_ins_index()
         
         for ins in ins_list:
-            ins_norm = normalize_ins(ins)
-            matched = ins_db[ins_db["normalized"] == ins_norm]
-            if not matched.empty:
-                row = matched.iloc[0]
-                row_data = row.to_dict()
+            row_data = ins_index.get(normalize_ins(ins))
+            if row_data is not None:
                 ins_number_display = str(row_data.get("ins_number", "")).strip()
                 name_th_display = str(row_data.get("name_th", "")).strip()
                 function_group_display = str(row_data.get("function_group", "")).strip()
@@ -1361,7 +1756,7 @@ def generate_label_report(food_name, food_type, food_consistency, main_ingredien
                     f"({function_group_display}) | 📋 ควรแสดงข้อความในฉลากว่า: {label_text}"
                 )
                 st.warning(f"⚠️ {message}")
-                required_labels.append(f"วัตถุเจือปนอาหาร: {label_text}")
+                add_label(f"วัตถุเจือปนอาหาร: {label_text}")
                 ins_results.append({
                     'has_special_label': True,
                     'message': message
@@ -1369,7 +1764,7 @@ def generate_label_report(food_name, food_type, food_consistency, main_ingredien
             else:
                 message = f"'{ins}' ไม่มีข้อความเฉพาะ สามารถแสดง 'วัตถุเจือปนอาหาร (INS {ins},...)' ร่วมกับวัตถุเจือปนตัวอื่นๆที่ไม่มีข้อความเฉพาะได้เลย"
                 st.success(f"✅ {message}")
-                required_labels.append(f"วัตถุเจือปนอาหาร (INS {ins})")
+                add_label(f"วัตถุเจือปนอาหาร (INS {ins})")
                 ins_results.append({
                     'has_special_label': False,
                     'message': message
@@ -1383,79 +1778,42 @@ def generate_label_report(food_name, food_type, food_consistency, main_ingredien
             st.info(f"ℹ️ มีสารก่อภูมิแพ้: {allergen_text} และได้ระบุไว้ในชื่ออาหารแล้ว → ไม่บังคับให้แสดง 'ข้อมูลสำหรับผู้แพ้อาหาร' สำหรับรายการนี้")
         else:
             st.warning(f"⚠️ **มีสารก่อภูมิแพ้**: {allergen_text}")
-            required_labels.append(f"แสดง ข้อมูลสำหรับผู้แพ้อาหาร: มี{allergen_text} หรือแสดง 'มี {allergen_text}' ในกรอบสี่เหลี่ยม")
+            add_label(ALLERGEN_LABEL_TPL.format_map({"allergens": allergen_text}))
     if maybe_allergen and maybe_allergen_groups:
         allergen_text2 = ", ".join(maybe_allergen_groups)
         st.warning(f"⚠️ **อาจมีการปนเปื้อนสารก่อภูมิแพ้**: {allergen_text2}")
-        required_labels.append(f"แสดง ข้อมูลสำหรับผู้แพ้อาหาร: อาจมี{allergen_text2} หรือแสดง 'อาจมี {allergen_text2}' ในกรอบสี่เหลี่ยม")
+        add_label(MAYBE_ALLERGEN_LABEL_TPL.format_map({"allergens": allergen_text2}))
     if not (has_allergen and allergen_groups) and not (maybe_allergen and maybe_allergen_groups):
         st.success("✅ **ไม่มีสารก่อภูมิแพ้**")
     
     # การกล่าวอ้างโภชนาการ
     st.markdown("### 📊 การกล่าวอ้างโภชนาการ")
     # เช็คว่าจะต้องมี GDA อยู่แล้วหรือไม่ เพื่อหลีกเลี่ยงการแจ้งซ้ำเรื่อง "ตารางโภชนาการ"
-    requires_gda_ui = (
-        food_type != "อื่นๆ (ที่ไม่ใช่อาหารควบคุมเฉพาะ)" and
-        food_type != "วุ้นสำเร็จรูป" and
-        food_type != "ผลิตภัณฑ์เสริมอาหาร" and
-        food_type != "ชาจากพืช"
-    )
+    requires_gda = food_type not in NON_GDA_TYPES
     if has_nutrition_claim:
         st.warning("⚠️ **มีการกล่าวอ้างโภชนาการ**")
-        if not requires_gda_ui:
+        if not requires_gda:
             st.info("📋 **หมายเหตุ**: ฉลากต้องมีตารางโภชนาการด้วย")
-        if not any("ตารางโภชนาการ" in str(x) for x in required_labels):
-            required_labels.append("ต้องแสดงตารางโภชนาการ")
+        if "nutrition_table" not in required_markers:
+            add_label(LABEL_NUTRITION_TABLE, "nutrition_table")
     else:
         st.success("✅ **ไม่มีการกล่าวอ้างโภชนาการ**")
     
     # ตรวจสอบประเภทอาหารที่ต้องแสดงฉลาก GDA และตารางโภชนาการ
-    if food_type != "อื่นๆ (ที่ไม่ใช่อาหารควบคุมเฉพาะ)" and food_type != "วุ้นสำเร็จรูป" and food_type != "ผลิตภัณฑ์เสริมอาหาร" and food_type != "ชาจากพืช":
-        st.warning("⚠️ **ประเภทอาหารที่ต้องแสดงฉลาก GDA**: ต้องแสดงฉลาก GDA และตารางโภชนาการตามประกาศฯ 394")
-        required_labels.append("ต้องแสดงฉลาก GDA ตามประกาศฯ 394")
-        if not any("ตารางโภชนาการ" in str(x) for x in required_labels):
-            required_labels.append("ต้องแสดงตารางโภชนาการ")
+    if requires_gda:
+        st.warning(WARN_GDA)
+        add_label(LABEL_GDA, "gda")
+        if "nutrition_table" not in required_markers:
+            add_label(LABEL_NUTRITION_TABLE, "nutrition_table")
     
     # คำเตือนเฉพาะตามประเภทอาหาร
     st.markdown("### ⚠️ คำเตือนเฉพาะตามประเภทอาหาร")
     
-    # วุ้นสำเร็จรูป
-    if food_type == "วุ้นสำเร็จรูป":
-        st.warning("⚠️ **วุ้นสำเร็จรูป**: ต้องแสดง 'เด็กควรบริโภคแต่น้อย' ด้วยตัวอักษรสีแดงขนาด 5 มิลลิเมตร ในกรอบพื้นสีขาว")
-        required_labels.append("แสดง 'เด็กควรบริโภคแต่น้อย' ด้วยตัวอักษรสีแดงขนาด 5 มิลลิเมตร ในกรอบพื้นสีขาว")
-    
-    if food_type == "ชาจากพืช":
-        herbal_tea_warning = "กรุณาศึกษารายชื่อพืชที่อนุญาต และคำเตือนเพิ่มเติม ในประกาศกระทรวงสาธารณสุข ฉบับที่ 426 เนื่องจากแอปนี้ไม่สามารถตรวจสอบได้"
-        st.warning(f"⚠️ **ชาจากพืช**: {herbal_tea_warning}")
-        required_labels.append(f"{herbal_tea_warning}")
-    
-    # ผลิตภัณฑ์เสริมอาหาร
-    if food_type == "ผลิตภัณฑ์เสริมอาหาร":
-        st.warning("⚠️ **ผลิตภัณฑ์เสริมอาหาร**: ต้องแสดงคำเตือนดังต่อไปนี้:")
-        st.warning("• 'คำเตือน' ด้วยตัวอักษรขนาดไม่เล็กกว่า 1.5 มม. ในกรอบสี่เหลี่ยม")
-        st.warning("• 'เด็กและสตรีมีครรภ์ ไม่ควรรับประทาน' ด้วยตัวอักษรที่มีขนาดเห็นได้ชัดเจน")
-        st.warning("• 'ควรกินอาหารหลากหลาย ครบ 5 หมู่ ในสัดส่วนที่เหมาะสมเป็นประจำ' ด้วยตัวอักษรที่มีขนาดเห็นได้ชัดเจน")
-        st.warning("• 'ไม่มีผลในการป้องกัน หรือรักษาโรค' ด้วยตัวอักษรหนาทึบ ในกรอบสี่เหลี่ยม")
-        required_labels.append("แสดง 'คำเตือน' ด้วยตัวอักษรขนาดไม่เล็กกว่า 1.5 มม. ในกรอบสี่เหลี่ยมสีของตัวอักษรตัดกับสีของพื้นกรอบ และสีกรอบตัดกับสีของพื้นฉลาก")
-        required_labels.append("แสดง 'เด็กและสตรีมีครรภ์ ไม่ควรรับประทาน' ด้วยตัวอักษรที่มีขนาดเห็นได้ชัดเจน")
-        required_labels.append("แสดง 'ควรกินอาหารหลากหลาย ครบ 5 หมู่ ในสัดส่วนที่เหมาะสมเป็นประจำ' ด้วยตัวอักษรที่มีขนาดเห็นได้ชัดเจน")
-        required_labels.append("แสดง 'ไม่มีผลในการป้องกัน หรือรักษาโรค' ด้วยตัวอักษรหนาทึบ ในกรอบสี่เหลี่ยม สีของตัวอักษรตัดกับสีของพื้นกรอบ และสีของกรอบตัดกับสีของพื้นฉลาก")
-    
-    # อาหารขบเคี้ยว ช็อกโกแลต และผลิตภัณฑ์ขนมอบ
-    if food_type in ["อาหารขบเคี้ยว ตัวอย่างเช่น มันฝรั่งทอดกรอบ ข้าวโพดอบกรอบ ข้าวเกรียบชนิดต่างๆ ถั่วลิสงส์อบปรุงรส สาหร่ายทอดอบกรอบ ปลาหมึกแผ่นอบกรอบ หมูแผ่นอบกรอบ", 
-                     "ช็อกโกแลต และขนมหวานรสช็อกโกแลต", 
-                     "ผลิตภัณฑ์ขนมอบ ตัวอย่างเช่น ขนมปังกรอบ ขนมขาไก่ เวเฟอร์สอดไส้ คุกกี้ เค้ก ขนมไหว้พระจันทร์ เอแคลร์ ครัวซองท์ พายไส้ต่างๆ"]:
-        st.warning("⚠️ **อาหารขบเคี้ยว/ช็อกโกแลต/ขนมอบ**: ต้องแสดงข้อความในกรอบสี่เหลี่ยมว่า 'บริโภคแต่น้อยและออกกำลังกายเพื่อสุขภาพ'")
-        required_labels.append("ข้อความ 'บริโภคแต่น้อยและออกกำลังกายเพื่อสุขภาพ' ด้วยตัวอักษรหนาทึบ เห็นได้ชัดเจน สีของตัวอักษรตัดกับสีพื้นของกรอบ และสีของกรอบตัดกับสีพื้นฉลาก")
-    
-    # เครื่องดื่มในภาชนะบรรจุที่ปิดสนิท - กาเฟอีน
-    if food_type == "เครื่องดื่มในภาชนะบรรจุที่ปิดสนิท":
-        if caffeine_option == "ใช้วัตถุแต่งกลิ่นรสที่มีกาเฟอีนตามธรรมชาติ":
-            st.warning("⚠️ **เครื่องดื่มกาเฟอีน**: ต้องมีคำเตือน 'มีกาเฟอีน' ด้วยตัวอักษรขนาดความสูงไม่น้อยกว่า 2 มิลลิเมตร")
-            required_labels.append("คำเตือน 'มีกาเฟอีน' ด้วยตัวอักษรขนาดความสูงไม่น้อยกว่า 2 มิลลิเมตร ที่อ่านได้ชัดเจน อยู่ในบริเวณเดียวกับชื่ออาหารหรือเครื่องหมายการค้า")
-        elif caffeine_option == "ผสมกาเฟอีนรูปแบบอื่น" and container_type:
-            st.warning(f"⚠️ **เครื่องดื่มกาเฟอีน**: ต้องแสดงข้อความ 'ห้ามดื่มเกินวันละ 2 {container_type} เพราะอาจทำให้ใจสั่น นอนไม่หลับ เด็กและสตรีมีครรภ์ไม่ควรดื่ม ผู้มีโรคประจำตัวหรือผู้ป่วยปรึกษาแพทย์ก่อน'")
-            required_labels.append(f"ข้อความ 'ห้ามดื่มเกินวันละ 2 {container_type} เพราะอาจทำให้ใจสั่น นอนไม่หลับ เด็กและสตรีมีครรภ์ไม่ควรดื่ม ผู้มีโรคประจำตัวหรือผู้ป่วยปรึกษาแพทย์ก่อน' ด้วยตัวอักษรเส้นทึบสีแดง ขนาดความสูงไม่น้อยกว่า 2 มิลลิเมตร ในกรอบสี่เหลี่ยมพื้นขาว สีของกรอบตัดกับสีของพื้นฉลาก")
+    requirements = compute_label_requirements(food_type, caffeine_option, container_type)
+    for message in requirements["warnings"]:
+        st.warning(message)
+    for label in requirements["required_labels"]:
+        add_label(label)
     
     # จัดเรียงข้อความที่ต้องมีในฉลากตามลำดับที่ต้องการ
     ordered_labels = []
@@ -1467,17 +1825,8 @@ def generate_label_report(food_name, food_type, food_consistency, main_ingredien
     ordered_labels.append("เลขสารบบอาหาร ในเครื่องหมายแสดงเลขสารบบอาหาร (ดาวน์โหลดได้ที่[เว็ปไซต์กองอาหาร](https://food.fda.moph.go.th/media.php?id=629151820018753536&name=No-Color.png))")
     
     # 3. ส่วนประกอบที่สำคัญ
-    if main_ingredients:
-        ingredients_text = ", ".join(main_ingredients)
-        if not single_ingredient_only:
-            if food_type == "ผลิตภัณฑ์เสริมอาหาร":
-                ordered_labels.append(
-                    f"ส่วนประกอบที่สำคัญ: {ingredients_text} พร้อมแสดงปริมาณ โดยให้เรียงลำดับปริมาณจากมากไปน้อย"
-                )
-            else:
-                ordered_labels.append(
-                    f"ส่วนประกอบที่สำคัญ: {ingredients_text} พร้อมแสดงร้อยละของน้ำหนักโดยประมาณ"
-                )
+    if ingredients_line:
+        ordered_labels.append(ingredients_line)
     
     # 4. น้ำหนัก/ปริมาณ
     if food_consistency == "ของเหลว":
@@ -1496,22 +1845,17 @@ def generate_label_report(food_name, food_type, food_consistency, main_ingredien
         ordered_labels.append(f"{foreign_manufacturer_line}")
 
     # 6. ฉลาก GDA และตารางโภชนาการ (แสดงครั้งเดียวถ้าเข้าได้หลายเงื่อนไข)
-    requires_gda = (
-        food_type != "อื่นๆ (ที่ไม่ใช่อาหารควบคุมเฉพาะ)"
-        and food_type != "วุ้นสำเร็จรูป"
-        and food_type != "ผลิตภัณฑ์เสริมอาหาร"
-        and food_type != "ชาจากพืช"
-    )
-    if requires_gda:
-        ordered_labels.append("ต้องแสดงฉลาก GDA ตามประกาศฯ 394")
-    if has_nutrition_claim or requires_gda:
-        if not any("ตารางโภชนาการ" in str(x) for x in ordered_labels):
-            ordered_labels.append("ต้องแสดงตารางโภชนาการ")
+    # ใช้ marker ที่ add_label บันทึกไว้แทนการตรวจเงื่อนไขหรือค้นหาข้อความซ้ำ
+    if "gda" in required_markers:
+        ordered_labels.append(LABEL_GDA)
+    if "nutrition_table" in required_markers:
+        ordered_labels.append(LABEL_NUTRITION_TABLE)
 
     # 7. อื่นๆที่เหลือ (วัตถุเจือปนอาหาร, สารก่อภูมิแพ้, การกล่าวอ้างโภชนาการ, คำเตือน, ข้อมูลเพิ่มเติม)
-    for label in required_labels:
-        if label not in ordered_labels:
-            ordered_labels.append(label)
+    # รวม required_labels ทั้งหมดในรอบเดียว (ข้อความ GDA/ตารางโภชนาการถูกเพิ่มในข้อ 6 แล้วจึงไม่ซ้ำ)
+    # required_labels เป็น dict จึงไม่มีคีย์ซ้ำกันเอง ตรวจเพียงว่าไม่ซ้ำกับข้อ 1-6
+    ordered_labels_set = set(ordered_labels)
+    ordered_labels.extend(label for label in required_labels if label not in ordered_labels_set)
 
     # 8. อายุของอาหาร
     if shelf_life_option == "ไม่เกิน 90 วัน":
@@ -1523,12 +1867,6 @@ def generate_label_report(food_name, food_type, food_consistency, main_ingredien
     if has_desiccant:
         ordered_labels.append("ระบุ 'มีซองวัตถุกันชื้น' ด้วยตัวอักษรสีแดง ขนาดตัวอักษรไม่ต่ำกว่า ๓ มิลลิเมตร บนพื้นสีขาว")
 
-    # เพิ่มข้อมูลอื่นๆที่เหลือ (แต่ไม่รวมข้อความที่ซ้ำกับ GDA และตารางโภชนาการ)
-    gda_labels = ["ต้องแสดงฉลาก GDA ตามประกาศฯ 394", "ต้องแสดงตารางโภชนาการ"]
-    for label in required_labels:
-        if label not in ordered_labels and label not in gda_labels:
-            ordered_labels.append(label)
-
     label_preview = build_label_preview_context(
         food_name,
         main_ingredients,
@@ -1549,95 +1887,23 @@ def generate_label_report(food_name, food_type, food_consistency, main_ingredien
 
     # ข้อมูลที่ต้องมีในฉลาก
     st.markdown("### ✅ ข้อมูลที่ต้องมีในฉลาก")
-    for i, label in enumerate(ordered_labels, 1):
-        st.write(f"{i}. {label}")
+    st.markdown("\n".join(f"{i}. {label}" for i, label in enumerate(ordered_labels, 1)))
     st.markdown("_อาจมีข้อมูลอื่นๆเพิ่มเติม เช่น ข้อแนะนำในการเก็บรักษา วิธีปรุงเพื่อรับประทาน คำเตือนอื่นๆ นอกเหนือจากที่กฎหมายกำหนด_")
 
     st.markdown("### 🏷️ ตัวอย่างฉลาก")
-    st.markdown(
-        """
-        <style>
-        .label-preview-box {
-            border: 2px solid #374151;
-            border-radius: 12px;
-            padding: 18px 22px;
-            background-color: #ffffff;
-            box-shadow: 0 2px 6px rgba(0, 0, 0, 0.08);
-        }
-        .label-preview-title {
-            font-size: 1.25rem;
-            font-weight: 700;
-            text-align: center;
-            margin-bottom: 12px;
-        }
-        .label-preview-label {
-            font-weight: 600;
-        }
-        .label-preview-line {
-            margin-bottom: 6px;
-        }
-        .label-preview-line.placeholder,
-        .label-preview-title.placeholder {
-            color: #d97706;
-            font-style: italic;
-        }
-        .label-preview-badge {
-            border: 2px solid #111827;
-            border-radius: 6px;
-            padding: 6px 12px;
-            text-align: center;
-            margin: 8px 0;
-            font-weight: 600;
-            display: inline-block;
-        }
-        .label-preview-badge.placeholder {
-            color: #d97706;
-            font-style: italic;
-        }
-        .label-preview-badge.warning {
-            border-color: #dc2626;
-            color: #dc2626;
-            background-color: #ffffff;
-        }
-        </style>
-        """,
-        unsafe_allow_html=True,
-    )
+    st.markdown(LABEL_CSS, unsafe_allow_html=True)
 
-    preview_lines_html = []
     all_preview_lines = label_preview.get("preview_lines") or (
         label_preview["core_lines"] + label_preview["extra_lines"]
     )
-    for line in all_preview_lines:
-        display_text = line.get("display_value", line["value"])
-        if line.get("box"):
-            badge_class = "label-preview-badge"
-            variant = line.get("badge_variant")
-            if variant:
-                badge_class += f" {variant}"
-            if line.get("is_placeholder"):
-                badge_class += " placeholder"
-            preview_lines_html.append(
-                f"<div class='{badge_class}'>{html.escape(display_text)}</div>"
-            )
-            continue
-        label_part = ""
-        if line["label"]:
-            label_part = f"<span class='label-preview-label'>{html.escape(line['label'])}:</span> "
-        value_part = html.escape(display_text)
-        line_class = "label-preview-line"
-        if line["is_placeholder"]:
-            line_class += " placeholder"
-        preview_lines_html.append(f"<div class='{line_class}'>{label_part}{value_part}</div>")
-
     title_class = "label-preview-title"
     if label_preview["title_is_placeholder"]:
         title_class += " placeholder"
 
     preview_html = (
         f"<div class='label-preview-box'>"
-        f"<div class='{title_class}'>{html.escape(label_preview['title'])}</div>"
-        f"{''.join(preview_lines_html)}"
+        f"<div class='{title_class}'>{label_preview['escaped_title']}</div>"
+        f"{''.join(_format_preview_line(line) for line in all_preview_lines)}"
         "</div>"
     )
 
@@ -1645,28 +1911,19 @@ def generate_label_report(food_name, food_type, food_consistency, main_ingredien
     with col_preview:
         st.markdown(preview_html, unsafe_allow_html=True)
     with col_images:
-        include_gda_image = any("ฉลาก GDA" in str(label) for label in ordered_labels)
-        include_nutrition_image = any("ตารางโภชนาการ" in str(label) for label in ordered_labels)
-        image_entries = prepare_preview_image_entries(
-            food_registration_number,
-            include_gda=include_gda_image,
-            include_nutrition=include_nutrition_image,
-        )
+        include_gda_image = "gda" in required_markers
+        include_nutrition_image = "nutrition_table" in required_markers
+        image_entries = _cached_preview_images(include_gda_image, include_nutrition_image)
         if image_entries:
-            for entry in image_entries:
-                image_obj = entry["image"]
-                caption = entry["caption"]
-                if isinstance(image_obj, Image.Image):
-                    st.image(image_obj, caption=caption, use_container_width=True)
-                else:
-                    st.image(str(image_obj), caption=caption, use_container_width=True)
+            images, captions = zip(*image_entries)
+            st.image(list(images), caption=list(captions), use_container_width=True)
         else:
             st.info("ยังไม่พบไฟล์ภาพในโฟลเดอร์ assets/")
     
     # สรุป
     st.markdown("### 📊 สรุป")
     st.success(f"✅ พบข้อมูลที่ต้องแสดงในฉลากทั้งหมด {len(ordered_labels)} รายการ")
-    st.warning("กรุณาศึกษาประกาศกระทรวงสาธารณสุขที่เกี่ยวข้องกับประเภทอาหารของท่านเพิ่มเติม เนื่องจากอาจมีข้อความที่กำหนดให้แสดงนอกเหนือจากนี้ ได้ที่[เว็ปไซต์กองอาหาร](https://food.fda.moph.go.th/food-law/category/food-product/)")
+    st.warning(WARN_FURTHER_STUDY)
 
     # สร้างข้อมูลสำหรับรายงาน Word
     report_data = {
@@ -1700,14 +1957,12 @@ def generate_label_report(food_name, food_type, food_consistency, main_ingredien
     # ปุ่มดาวน์โหลดรายงาน
     st.markdown("### 📥 ดาวน์โหลดรายงาน")
     
-    try:
-        word_stream = generate_label_word_report(report_data)
-        st.download_button(
-            label="📥 ดาวน์โหลดรายงาน Word (.docx)",
-            data=word_stream.getvalue(),
-            file_name=f"label_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx",
-            mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-            type="primary"
-        )
-    except Exception as e:
-        st.error(f"เกิดข้อผิดพลาดในการสร้างรายงาน Word: {str(e)}")
+    # สร้างไฟล์ Word เมื่อผู้ใช้กดดาวน์โหลดเท่านั้น และไม่ rerun หน้าเพื่อให้ผลตรวจสอบยังแสดงอยู่
+    st.download_button(
+        label="📥 ดาวน์โหลดรายงาน Word (.docx)",
+        data=functools.partial(_label_report_download_data, report_data),
+        file_name=f"label_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx",
+        mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+        type="primary",
+        on_click="ignore",
+    )
@@ -1,14 +1,17 @@
 import streamlit as st
 
+# กล่องข้อควรระวังเป็น HTML คงที่ สร้างครั้งเดียวและส่งผ่าน st.html โดยไม่ต้องผ่านตัวแปลง markdown
+DISCLAIMER_HTML = """
+<div style="background-color: #fff3cd; color: #856404; padding: 1rem; border-radius: 0.5rem; margin-bottom: 1.5rem; border: 1px solid #ffeeba;">
+    <p style="font-weight: bold; font-size: 1.1rem; margin: 0;">🚨 ข้อควรระวัง</p>
+    <p style="margin: 0.5rem 0 0 0;">
+        แอปพลิเคชันนี้เป็นตัวช่วยในการคำนวณและตรวจสอบฉลากอาหารเท่านั้น ไม่สามารถใช้เป็นเงื่อนไขการขออนุญาต หรืออ้างอิงทางกฎหมายได้ โปรดปฏิบัติตามกฎหมายอย่างเคร่งครัด
+    </p>
+</div>
+"""
+
 def show_disclaimer():
-    st.markdown("""
-    <div style="background-color: #fff3cd; color: #856404; padding: 1rem; border-radius: 0.5rem; margin-bottom: 1.5rem; border: 1px solid #ffeeba;">
-        <p style="font-weight: bold; font-size: 1.1rem; margin: 0;">🚨 ข้อควรระวัง</p>
-        <p style="margin: 0.5rem 0 0 0;">
-            แอปพลิเคชันนี้เป็นตัวช่วยในการคำนวณและตรวจสอบฉลากอาหารเท่านั้น ไม่สามารถใช้เป็นเงื่อนไขการขออนุญาต หรืออ้างอิงทางกฎหมายได้ โปรดปฏิบัติตามกฎหมายอย่างเคร่งครัด
-        </p>
-    </div>
-    """, unsafe_allow_html=True)
+    st.html(DISCLAIMER_HTML)
 
 st.set_page_config(
     page_title="ฉลากชัวร์",
@@ -16,31 +19,35 @@ st.set_page_config(
     layout="wide"
 )
 
-import main_page
-import ocr_check
-import Label_check
-import nutrition_check
-
-
-st.sidebar.title("เมนู")
-page = st.sidebar.radio(
-    "เลือกหมวดที่ต้องการตรวจสอบ",
-    (
-        "หน้าหลัก",
-        "ตรวจสอบฉลากจากภาพด้วย AI",  
-        "ตรวจสอบข้อมูลที่ต้องแสดงในฉลากอาหาร",
-        "ตรวจสอบข้อความกล่าวอ้างโภชนาการ"
-    )
+# โมดูลของแต่ละหน้าถูก import เฉพาะเมื่อผู้ใช้เปิดหน้านั้น
+# (Label_check/nutrition_check โหลด pandas, python-docx, Pillow ซึ่งไม่จำเป็นสำหรับหน้าหลัก)
+def main_page_view():
+    import main_page
+    main_page.show()
+
+def ocr_check_view():
+    import ocr_check
+    ocr_check.show()
+
+def label_check_view():
+    import Label_check
+    Label_check.show()
+
+def nutrition_check_view():
+    import nutrition_check
+    nutrition_check.show()
+
+# ใช้ระบบหลายหน้าของ Streamlit แทน radio ในแถบด้านข้าง
+page = st.navigation(
+    [
+        st.Page(main_page_view, title="หน้าหลัก", url_path="home", default=True),
+        st.Page(ocr_check_view, title="ตรวจสอบฉลากจากภาพด้วย AI", url_path="ocr"),
+        st.Page(label_check_view, title="ตรวจสอบข้อมูลที่ต้องแสดงในฉลากอาหาร", url_path="label"),
+        st.Page(nutrition_check_view, title="ตรวจสอบข้อความกล่าวอ้างโภชนาการ", url_path="nutrition"),
+    ]
 )
 
 # Show disclaimer on all pages
 show_disclaimer()
 
-if page == "หน้าหลัก":
-    main_page.show()
-elif page == "ตรวจสอบฉลากจากภาพด้วย AI":  
-    ocr_check.show()
-elif page == "ตรวจสอบข้อมูลที่ต้องแสดงในฉลากอาหาร":
-    Label_check.show()
-elif page == "ตรวจสอบข้อความกล่าวอ้างโภชนาการ":
-    nutrition_check.show()
+page.run()
@@ -1,31 +1,51 @@
 # checks.py
 import re
+from functools import lru_cache
+
+# รูปแบบเลขสารบบอาหาร เช่น 12-1-12345-1-0001 (compile ครั้งเดียวตอน import)
+_REG_NUM_RE = re.compile(r"\d{2}\s*-\s*\d{1}\s*-\s*\d{5}\s*-\s*\d{1}\s*-\s*\d{4}")
+
+# คำสำคัญของแต่ละหมวด ใช้ร่วมกันในการสแกนข้อความ OCR รอบเดียว
+PHRASE_KEYWORDS = {
+    "expiry": ("หมดอายุ", "ควรบริโภคก่อน"),
+    "packsize": ("ปริมาตร", "น้ำหนัก"),
+    "producer": ("ผลิตโดย", "ผู้ผลิต", "นำเข้า", "สำนักงานใหญ่"),
+    "ingredients": ("ประกอบด้วย", "ส่วนประกอบ", "โดยประมาณ"),
+    "allergy": ("แพ้อาหาร",),
+}
+# หนึ่ง alternation ต่อหมวด เพื่อไม่ให้คำของหมวดหนึ่งที่เป็นส่วนต้นของคำในอีกหมวดถูกกลบ
+_CATEGORY_RES = tuple(
+    (category, re.compile("|".join(re.escape(kw) for kw in keywords)))
+    for category, keywords in PHRASE_KEYWORDS.items()
+)
+
+@lru_cache(maxsize=32)
+def scan_phrases(ocr_text):
+    """คืนชุดหมวดคำสำคัญที่พบในข้อความ (คำนวณครั้งเดียวต่อข้อความ ใช้ร่วมกันทุก check)"""
+    return frozenset(category for category, pattern in _CATEGORY_RES if pattern.search(ocr_text))
 
 # ตรวจสอบข้อความเกี่ยวกับวันหมดอายุ
 def check_expiry_phrases(ocr_text):
-    keywords = ["หมดอายุ", "ควรบริโภคก่อน"]
-    return not any(kw in ocr_text for kw in keywords)
+    return "expiry" not in scan_phrases(ocr_text)
 
 # ตรวจสอบข้อความเกี่ยวกับปริมาณสุทธิ
 def check_packsize_phrases(ocr_text):
-    keywords = ["ปริมาตร", "น้ำหนัก"]
-    return not any(kw in ocr_text for kw in keywords)
+    return "packsize" not in scan_phrases(ocr_text)
 
 def check_registration_number(ocr_text):
-    pattern = r"\d{2}\s*-\s*\d{1}\s*-\s*\d{5}\s*-\s*\d{1}\s*-\s*\d{4}"
-    return not re.search(pattern, ocr_text)
+    # เลขสารบบต้องมีขีดอย่างน้อย 4 ตัว ถ้าไม่ถึงไม่ต้องเรียก regex
+    if ocr_text.count("-") < 4:
+        return True
+    return not _REG_NUM_RE.search(ocr_text)
 
 def check_producer(ocr_text):
-    keywords = ["ผลิตโดย", "ผู้ผลิต", "นำเข้า", "สำนักงานใหญ่"]
-    return not any(kw in ocr_text for kw in keywords)
+    return "producer" not in scan_phrases(ocr_text)
 
 def check_ingredients(ocr_text):
-    keywords = ["ประกอบด้วย", "ส่วนประกอบ", "โดยประมาณ"]
-    return not any(kw in ocr_text for kw in keywords)
+    return "ingredients" not in scan_phrases(ocr_text)
 
 # ตรวจสอบคำเตือนสำหรับผู้แพ้อาหาร
 def check_allergy_warning(ocr_text):
-    keywords = ["แพ้อาหาร"]
-    return not any(kw in ocr_text for kw in keywords)
+    return "allergy" not in scan_phrases(ocr_text)
 
-# สามารถเพิ่มฟังก์ชันใหม่ๆ ได้ที่นี่ โดยใช้โครงสร้างเดียวกัน
+# สามารถเพิ่มฟังก์ชันใหม่ๆ ได้ที่นี่ โดยใช้โครงสร้างเดียวกัน (เพิ่มคำสำคัญใน PHRASE_KEYWORDS)
@@ -1,4 +1,26 @@
 import pandas as pd
+from functools import lru_cache
+
+DISCLAIMER_RULES_FILE = 'disclaimer_rules.csv'
+
+# Map Thai nutrient names to English keys and units
+NUTRIENT_MAP = {
+    'total_fat': {'thai': 'ไขมันทั้งหมด', 'unit': 'กรัม'},
+    'saturated_fat': {'thai': 'ไขมันอิ่มตัว', 'unit': 'กรัม'},
+    'cholesterol': {'thai': 'คอเลสเตอรอล', 'unit': 'มิลลิกรัม'},
+    'sodium': {'thai': 'โซเดียม', 'unit': 'มิลลิกรัม'}, 
+    'total_sugars': {'thai': 'น้ำตาลทั้งหมด', 'unit': 'กรัม'}
+}
+
+@lru_cache(maxsize=1)
+def _load_thresholds(rules_path=DISCLAIMER_RULES_FILE):
+    """Read the disclaimer rules once and return {Thai nutrient name: threshold}."""
+    rules_df = pd.read_csv(rules_path)
+    thresholds = {}
+    for nutrient, threshold in zip(rules_df['nutrient'], rules_df['threshold']):
+        # keep the first rule per nutrient, like the previous iloc[0] lookup
+        thresholds.setdefault(nutrient, threshold)
+    return thresholds
 
 def check_disclaimers(nutrients):
     """
@@ -15,22 +37,13 @@ def check_disclaimers(nutrients):
     Returns:
         list: List of disclaimer messages for nutrients that exceed thresholds
     """
-    # Read disclaimer rules
-    rules_df = pd.read_csv('disclaimer_rules.csv')
-    
-    # Map Thai nutrient names to English keys and units
-    nutrient_map = {
-        'total_fat': {'thai': 'ไขมันทั้งหมด', 'unit': 'กรัม'},
-        'saturated_fat': {'thai': 'ไขมันอิ่มตัว', 'unit': 'กรัม'},
-        'cholesterol': {'thai': 'คอเลสเตอรอล', 'unit': 'มิลลิกรัม'},
-        'sodium': {'thai': 'โซเดียม', 'unit': 'มิลลิกรัม'}, 
-        'total_sugars': {'thai': 'น้ำตาลทั้งหมด', 'unit': 'กรัม'}
-    }
+    # Disclaimer rules are read once per process
+    thresholds = _load_thresholds()
     
     disclaimers = []
     
     # Check each nutrient against threshold
-    for eng_name, info in nutrient_map.items():
+    for eng_name, info in NUTRIENT_MAP.items():
         if eng_name not in nutrients:
             continue
             
@@ -39,9 +52,8 @@ def check_disclaimers(nutrients):
         unit = info['unit']
         
         # Find threshold for this nutrient
-        rule = rules_df[rules_df['nutrient'] == thai_name]
-        if not rule.empty:
-            threshold = rule['threshold'].iloc[0]
+        threshold = thresholds.get(thai_name)
+        if threshold is not None:
             
             # If value is strictly greater than threshold, add disclaimer
             if value > threshold:
@@ -50,13 +62,58 @@ def check_disclaimers(nutrients):
                     'value': value,
                     'threshold': threshold,
                     'unit': unit,
-                    'message': f"⚠️ {thai_name} {value:.1f} {unit} (เกินค่าที่กำหนด {threshold:.1f} {unit})\n"
-                             f"ต้องมีคำชี้แจง (Disclaimer) ประกอบคำกล่าวอ้าง: มี{thai_name}ต่อหน่วยบริโภค {value:.1f} {unit}"
+                    'message': _disclaimer_message(thai_name, value, threshold, unit)
                 }
                 disclaimers.append(disclaimer)
     
     return disclaimers
 
+def check_disclaimers_batch(nutrients_df):
+    """
+    Vectorized check_disclaimers for many products at once.
+    
+    Args:
+        nutrients_df (pd.DataFrame): One row per product, with any of the
+            NUTRIENT_MAP keys as columns
+            
+    Returns:
+        pd.DataFrame: One row per exceeded nutrient, with the source row index
+        in 'row' plus the same fields as check_disclaimers
+    """
+    thresholds = _load_thresholds()
+    
+    # Only nutrients present in both the data and the rules are compared
+    columns = [eng_name for eng_name, info in NUTRIENT_MAP.items()
+               if eng_name in nutrients_df.columns and info['thai'] in thresholds]
+    column_thresholds = pd.Series({eng_name: thresholds[NUTRIENT_MAP[eng_name]['thai']] for eng_name in columns},
+                                  dtype=float)
+    
+    # One comparison for the whole table; NaN values never exceed
+    values = nutrients_df[columns].astype(float)
+    exceeded = values.gt(column_thresholds, axis='columns')
+    
+    disclaimers = []
+    for row_pos, col_pos in zip(*exceeded.to_numpy().nonzero()):
+        row = values.index[row_pos]
+        eng_name = columns[col_pos]
+        info = NUTRIENT_MAP[eng_name]
+        value = values.iat[row_pos, col_pos]
+        threshold = column_thresholds[eng_name]
+        disclaimers.append({
+            'row': row,
+            'nutrient': info['thai'],
+            'value': value,
+            'threshold': threshold,
+            'unit': info['unit'],
+            'message': _disclaimer_message(info['thai'], value, threshold, info['unit'])
+        })
+    
+    return pd.DataFrame(disclaimers, columns=['row', 'nutrient', 'value', 'threshold', 'unit', 'message'])
+
+def _disclaimer_message(thai_name, value, threshold, unit):
+    return (f"⚠️ {thai_name} {value:.1f} {unit} (เกินค่าที่กำหนด {threshold:.1f} {unit})\n"
+            f"ต้องมีคำชี้แจง (Disclaimer) ประกอบคำกล่าวอ้าง: มี{thai_name}ต่อหน่วยบริโภค {value:.1f} {unit}")
+
 def display_disclaimers(nutrients):
     """
     Display all applicable disclaimers for given nutrient values.
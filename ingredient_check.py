@@ -1,17 +1,7 @@
 import streamlit as st
-import pandas as pd
-import re
 
-@st.cache_data
-def load_ins_database():
-    return pd.read_csv("ins_database.csv", encoding="utf-8-sig")
-
-@st.cache_data
-def load_warnings_database():
-    return pd.read_csv("warnings_database.csv", encoding="utf-8-sig")
-
-def normalize_ins(s):
-    return re.sub(r"\s+", "", str(s)).lower()
+# ใช้ฐานข้อมูลและดัชนีชุดเดียวกับหน้า Label_check (key และการโหลดใหม่เมื่อไฟล์ CSV เปลี่ยนตรงกัน)
+from Label_check import load_ins_index, load_warnings_index, normalize_ins
 
 def show():
     st.title("ตรวจสอบการแสดงข้อความของสูตรส่วนประกอบ (อยู่ระหว่างพัฒนา)")
@@ -22,7 +12,12 @@ def show():
     
     if "ins_count" not in st.session_state:
         st.session_state.ins_count = 3
-    
+
+    _ingredients_fragment()
+
+# ส่วนกรอกและผลตรวจสอบเป็น fragment: ปุ่ม "+" และปุ่มตรวจสอบจะ rerun เฉพาะส่วนนี้ ไม่ rerun ทั้งแอป
+@st.fragment
+def _ingredients_fragment():
     # Function to add more fields
     def add_main_ingredient():
         st.session_state.main_ingredient_count += 1
@@ -30,52 +25,48 @@ def show():
     def add_ins():
         st.session_state.ins_count += 1
 
-    # Main ingredients section with button on the right
-    col1, col2 = st.columns([3, 1])
+    # ปุ่มเพิ่มช่องกรอกต้องอยู่นอกฟอร์ม เพราะต้อง rerun เพื่อสร้างช่องใหม่ทันที
+    col1, col2 = st.columns(2)
     with col1:
-        st.subheader("ส่วนประกอบหลัก")
-    with col2:
         st.button("+ เพิ่มส่วนประกอบหลัก", on_click=add_main_ingredient)
-    
-    main_ingredients = []
-    for i in range(st.session_state.main_ingredient_count):
-        main_ing = st.text_input(f"ส่วนประกอบหลัก {i+1}", key=f"main_ing_{i}")
-        if main_ing:
-            main_ingredients.append(main_ing)
-    
-    # Add vertical spacing between sections
-    st.write("")
-    st.write("")
-    
-    # INS section with button on the right
-    col1, col2 = st.columns([3, 1])
-    with col1:
-        st.subheader("วัตถุเจือปนอาหาร")
     with col2:
         st.button("+ เพิ่มวัตถุเจือปนอาหาร", on_click=add_ins)
-    
-    ins_list = []
-    for i in range(st.session_state.ins_count):
-        ins = st.text_input(f"เลข INS {i+1}", key=f"ins_{i}")
-        if ins:
-            ins_list.append(ins)
-    
-    st.markdown(
-    "🔗 สามารถค้นหาเลข INS ได้ที่เว็ปไซต์ [กองอาหาร (อย.)](https://alimentum.fda.moph.go.th/FDA_FOOD_MVC/Additive/Main)"
-    )
 
-    if st.button("🔍 ตรวจสอบสูตรส่วนประกอบ"):
-        ins_db = load_ins_database()
-        warnings_db = load_warnings_database()
+    # รวมช่องกรอกทั้งหมดไว้ในฟอร์ม เพื่อให้ rerun ครั้งเดียวตอนกดตรวจสอบ แทนการ rerun ทุกครั้งที่แก้ช่องใดช่องหนึ่ง
+    with st.form("ingredients_form"):
+        st.subheader("ส่วนประกอบหลัก")
+        main_ingredients = []
+        for i in range(st.session_state.main_ingredient_count):
+            main_ing = st.text_input(f"ส่วนประกอบหลัก {i+1}", key=f"main_ing_{i}")
+            if main_ing:
+                main_ingredients.append(main_ing)
+
+        # Add vertical spacing between sections
+        st.write("")
+        st.write("")
+
+        st.subheader("วัตถุเจือปนอาหาร")
+        ins_list = []
+        for i in range(st.session_state.ins_count):
+            ins = st.text_input(f"เลข INS {i+1}", key=f"ins_{i}")
+            if ins:
+                ins_list.append(ins)
+
+        st.markdown(
+        "🔗 สามารถค้นหาเลข INS ได้ที่เว็ปไซต์ [กองอาหาร (อย.)](https://alimentum.fda.moph.go.th/FDA_FOOD_MVC/Additive/Main)"
+        )
+
+        submitted = st.form_submit_button("🔍 ตรวจสอบสูตรส่วนประกอบ")
 
+    if submitted:
         # 🔍 ตรวจสอบคำเตือนจากส่วนประกอบหลัก
         if main_ingredients:
             st.markdown("### ผลการตรวจสอบคำเตือนจากส่วนประกอบหลัก")
+            warnings_index = load_warnings_index()
 
             for ing in main_ingredients:
-                matched = warnings_db[warnings_db["keyword"].str.strip().str.lower() == ing.lower()]
-                if not matched.empty:
-                    row = matched.iloc[0]
+                row = warnings_index.get(ing.lower())
+                if row is not None:
                     st.warning(f"⚠️ คำเตือนสำหรับ '{ing}': {row['warning']}")
                 else:
                     st.success(f"✅ '{ing}' ไม่พบคำเตือนเฉพาะ")
@@ -84,13 +75,11 @@ def show():
         if ins_list:
             st.markdown("### ผลการตรวจสอบวัตถุเจือปนอาหาร (INS)")
 
-            ins_db["normalized"] = ins_db["ins_number"].astype(str).apply(normalize_ins)
+            ins_index = load_ins_index()
 
             for ins in ins_list:
-                ins_norm = normalize_ins(ins)
-                matched = ins_db[ins_db["normalized"] == ins_norm]
-                if not matched.empty:
-                    row = matched.iloc[0]
+                row = ins_index.get(normalize_ins(ins))
+                if row is not None:
                     st.warning(
                         f"⚠️ INS {row['ins_number']} คือ {row['name_th']} ({row['function_group']}) | 📋 ควรแสดงข้อความในฉลากว่า: {row['label_required_format']}"
                     )